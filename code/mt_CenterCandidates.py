@@ -0,0 +1,136 @@
+# Pràctica de creació de zones electorals per algorismes genètics
+#
+# IC - MUSI 21 22 - UIB
+#
+# Alumne: Lluís Bernat Ladaria
+
+"""
+CenterCandidates class - library
+"""
+
+#
+# system libraries
+#
+
+from shapely.geometry.base import BaseGeometry
+from shapely.geometry.point import Point
+import numpy as np
+
+try:
+    # shapely >= 2.0
+    from shapely import contains_xy
+except ImportError:
+    # shapely 1.x
+    from shapely.vectorized import contains as contains_xy
+
+#
+# ours libraries
+#
+
+from mt_DistrictModel import DistrictModel
+import mt_common as our
+
+
+def make_lattice(valid_area: BaseGeometry, size: int) -> np.ndarray:
+    """
+    Generate a square lattice of about 'size' points
+    into the study region
+
+    :param valid_area: the study region
+    :param size: the wanted number of points
+    :return: (n, 2) array with the points coordinates
+    """
+
+    if type(size) is not int or size < 1:
+        raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+    x_min, y_min, x_max, y_max = valid_area.bounds
+
+    # the lattice step that puts 'size' points into the region area
+    step = np.sqrt(valid_area.area / size)
+
+    # centered into the bounding box
+    xs = np.arange(x_min + (x_max - x_min) % step / 2, x_max, step)
+    ys = np.arange(y_min + (y_max - y_min) % step / 2, y_max, step)
+    x, y = (grid.ravel() for grid in np.meshgrid(xs, ys))
+
+    inside = contains_xy(valid_area, x, y)
+    lattice = np.column_stack((x[inside], y[inside]))
+
+    return lattice
+
+
+class CenterCandidates:
+    """
+    Class that encapsulates a fixed set of zone center candidates
+
+    With a discrete centers encoding, each gene is one of these candidates:
+    - the districts centroids (our.GA_CENTERS_CENTROIDS)
+    - or a lattice of points into the study region (our.GA_CENTERS_LATTICE)
+    The distances from every district centroid to every candidate
+    are computed once, so decoding a partition is a table lookup
+    (see get_distances), found by the integer identifier of each gene
+    (see get_ids).
+    The table grows as num_districts x num_candidates
+    (the square of the districts, with the centroids encoding),
+    so it is limited to GA_CENTERS_MAX_TABLE_SIZE distances
+
+    :param model: the districts model
+    :param valid_area: the study region
+    :param encoding: the candidates set (our.GA_CENTERS_CENTROIDS or our.GA_CENTERS_LATTICE)
+    """
+
+    def __init__(self, model: DistrictModel, valid_area: BaseGeometry, encoding: str):
+        # create the candidates set
+        #
+
+        if encoding == our.GA_CENTERS_CENTROIDS:
+            coords = model.centroids
+        elif encoding == our.GA_CENTERS_LATTICE:
+            coords = make_lattice(valid_area=valid_area, size=our.GA_CENTERS_LATTICE_SIZE)
+        else:
+            raise ValueError(our.MG_ERROR_CENTER_ENCODING)
+
+        # without repeated candidates
+        _, first = np.unique(coords, axis=0, return_index=True)
+        self.coords = coords[np.sort(first)]
+        self.num_candidates = len(self.coords)
+
+        # the candidates as points
+        # and the integer identifier of each one
+        self.points = [Point(x, y) for x, y in self.coords.tolist()]
+        self.index = {(x, y): i for i, (x, y) in enumerate(self.coords.tolist())}
+
+        # (num_districts, num_candidates) distances table
+        if model.num_districts * self.num_candidates > our.GA_CENTERS_MAX_TABLE_SIZE:
+            raise ValueError(our.MG_ERROR_CANDIDATES_TABLE.format(model.num_districts, self.num_candidates))
+        self.distances = model.center_distances(centers=self.coords)
+
+        pass
+
+    def get_ids(self, centers: np.ndarray) -> np.ndarray:
+        # return the identifier of each one of the 'centers'
+        # ((num_centers, 2) array of candidates coordinates)
+
+        try:
+            ids = np.array([self.index[center] for center in map(tuple, centers.tolist())], dtype=np.int64)
+        except KeyError:
+            # not a candidate
+            raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+        return ids
+
+    def get_distances(self, centers: np.ndarray, districts: np.ndarray = None) -> np.ndarray:
+        # return the (num_districts, num_centers) matrix of distances
+        # from each district centroid to each one of the 'centers'
+        # ((num_centers, 2) array of candidates coordinates)
+        # or only from the 'districts' centroids, if given
+
+        ids = self.get_ids(centers)
+
+        if districts is None:
+            distances = self.distances[:, ids]
+        else:
+            distances = self.distances[np.ix_(districts, ids)]
+
+        return distances
@@ -0,0 +1,68 @@
+# Pràctica de creació de zones electorals per algorismes genètics
+#
+# IC - MUSI 21 22 - UIB
+#
+# Alumne: Lluís Bernat Ladaria
+
+"""
+Checkpoint files - library
+
+A checkpoint is the state of a PartitionDesigner run
+(see PartitionDesigner.fit), saved as a NumPy .npz file:
+only arrays and strings (no pickled objects), so it is compact,
+and it can be loaded by any version of the code that knows its entries.
+Each checkpoint replaces the previous one atomically:
+it is written to a temporary file and then renamed,
+so a crash while saving it never leaves a broken checkpoint
+"""
+
+#
+# system libraries
+#
+
+import os
+import numpy as np
+
+#
+# ours libraries
+#
+
+import mt_common as our
+
+
+def save_checkpoint(file_name: str, state: dict):
+    """
+    Save a run state to a checkpoint file
+
+    :param file_name: the checkpoint file name
+    :param state: a dict of NumPy arrays, numbers and strings
+    """
+
+    arrays = {key: np.asarray(value) for key, value in state.items()}
+    arrays[our.CHECKPOINT_VERSION_ENTRY] = np.asarray(our.CHECKPOINT_FORMAT_VERSION)
+
+    tmp_file_name = file_name + '.' + str(os.getpid()) + '.tmp'
+    with open(tmp_file_name, 'wb') as outfile:
+        np.savez(outfile, **arrays)
+        outfile.flush()
+        os.fsync(outfile.fileno())
+    os.replace(tmp_file_name, file_name)
+
+    pass
+
+
+def load_checkpoint(file_name: str) -> dict:
+    """
+    Load a run state from a checkpoint file (see save_checkpoint)
+
+    :param file_name: the checkpoint file name
+    :return: a dict of NumPy arrays
+    """
+
+    with np.load(file_name, allow_pickle=False) as checkpoint:
+        state = {key: checkpoint[key] for key in checkpoint.files}
+
+    if int(state.pop(our.CHECKPOINT_VERSION_ENTRY, -1)) != our.CHECKPOINT_FORMAT_VERSION:
+        raise ValueError(our.MG_ERROR_CHECKPOINT.format(file_name))
+
+    return state
@@ -0,0 +1,103 @@
+# Pràctica de creació de zones electorals per algorismes genètics
+#
+# IC - MUSI 21 22 - UIB
+#
+# Alumne: Lluís Bernat Ladaria
+
+"""
+DistanceCache class - library
+"""
+
+#
+# system libraries
+#
+
+import numpy as np
+
+#
+# ours libraries
+#
+
+from mt_DistrictModel import DistrictModel
+from mt_LRUCache import LRUCache
+
+
+class DistanceCache:
+    """
+    Class that encapsulates a cache of district distances columns
+
+    Crossover only recombines the parents zone centers
+    and mutation replaces a few of them, so almost every
+    zone center of a child was already decoded at a parent.
+    This cache maps each zone center (its coordinates)
+    to its precomputed column of distances to every district centroid
+    (see DistrictModel.center_distances),
+    so decoding a child becomes a gather plus an argmin.
+    The least recently used columns are evicted when
+    'capacity' columns are reached
+
+    :param model: the districts model
+    :param capacity: max number of cached columns
+    """
+
+    def __init__(self, model: DistrictModel, capacity: int):
+        # create the cache instance
+        #
+
+        self._model = model
+
+        # {(x, y): distances column}
+        self._columns = LRUCache(capacity=capacity)
+
+        pass
+
+    def get_capacity(self) -> int:
+        # return the max number of cached columns
+        #
+
+        return self._columns.get_capacity()
+
+    def get_distances(self, centers: np.ndarray, districts: np.ndarray = None) -> np.ndarray:
+        # return the (num_districts, num_centers) matrix of distances
+        # from each district centroid to each one of the 'centers'
+        # ((num_centers, 2) array of coordinates)
+        # or only from the 'districts' centroids, if given
+        # computing only the not cached columns
+
+        columns = list()
+        missing = list()
+
+        for k, center in enumerate(map(tuple, centers.tolist())):
+            column = self._columns.get(center)
+            if column is None:
+                missing.append(k)
+            columns.append(column)
+
+        if len(missing) > 0:
+            new_columns = self._model.center_distances(centers=centers[missing])
+
+            for n, k in enumerate(missing):
+                column = new_columns[:, n].copy()
+                self._columns.put(tuple(centers[k].tolist()), column)
+                columns[k] = column
+
+        if districts is not None:
+            columns = [column[districts] for column in columns]
+
+        distances = np.column_stack(columns)
+
+        return distances
+
+    def add_lookups(self, hits: int, misses: int):
+        # count the lookups made at a worker process copy of this cache
+        # (see PartitionDesigner._take_worker_results)
+
+        self._columns.add_lookups(hits=hits, misses=misses)
+
+        pass
+
+    def get_stats(self) -> (int, int, int, float):
+        # return the cache statistics:
+        # hits, misses, evictions and hit rate
+
+        return self._columns.get_stats()
@@ -0,0 +1,327 @@
+# Pràctica de creació de zones electorals per algorismes genètics
+#
+# IC - MUSI 21 22 - UIB
+#
+# Alumne: Lluís Bernat Ladaria
+
+"""
+DistrictModel class - library
+"""
+
+#
+# system libraries
+#
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    # without scipy, the nearest centers are always searched by brute force
+    cKDTree = None
+
+#
+# ours libraries
+#
+
+import mt_common as our
+
+
+class DistrictModel:
+    """
+    Class that encapsulates a compact, integer indexed,
+    representation of the districts to be zoned
+
+    It is built once (per PartitionDesigner) from the data list
+    and the geodata dictionary, so the GA hot loops work with
+    integer arrays instead of codes, dictionaries and lists.
+    Each district is identified by its position at the data list, and
+    - its code is at codes[i]
+    - its value (population) at values[i]
+    - its centroid at centroids[i] (a (n, 2) array)
+    - its neighbours and connectivity costs at CSR (compressed sparse row)
+      arrays: indices[indptr[i]:indptr[i + 1]] and costs[indptr[i]:indptr[i + 1]]
+      (only the neighbours that are also at the data list)
+
+    :param data: the districts list (see PartitionDesigner)
+    :param geodata: the districts geodata dictionary (see PartitionDesigner)
+    """
+
+    def __init__(self, data: list, geodata: dict):
+        # create the model
+        #
+
+        # save parameters, they are needed to serialize the zones
+        self.data = data
+        self.geodata = geodata
+
+        # districts codes and its positions
+        self.codes = [district[our.LIST_DATA_CODE_COL] for district in data]
+        self.code_index = {code: i for i, code in enumerate(self.codes)}
+        self.num_districts = len(self.codes)
+
+        # districts values
+        self.values = np.array([district[our.LIST_DATA_VALUE_COL] for district in data])
+
+        # districts centroids
+        self.centroids = np.array(
+            [geodata[code][our.DICT_DISTRICT_CENTROID_POINT] for code in self.codes],
+            dtype=float).reshape(self.num_districts, 2)
+
+        # neighbours CSR arrays
+        self.indptr = np.zeros(self.num_districts + 1, dtype=np.int64)
+        indices = list()
+        costs = list()
+        for i, code in enumerate(self.codes):
+            entry = geodata[code]
+            seen = set()
+            for neighbour, cost in zip(entry[our.DICT_DISTRICT_NEIGHBOURS_CODE_LIST],
+                                       entry[our.DICT_DISTRICT_NEIGHBOURS_COST_LIST]):
+                j = self.code_index.get(neighbour)
+                # ignore districts not to be zoned, and repeated ones
+                if j is not None and j not in seen:
+                    seen.add(j)
+                    indices.append(j)
+                    costs.append(cost)
+            self.indptr[i + 1] = len(indices)
+        self.indices = np.array(indices, dtype=np.int64)
+        self.costs = np.array(costs, dtype=float)
+
+        # the source district of each (directed) neighbourhood edge
+        self.edge_src = np.repeat(np.arange(self.num_districts), np.diff(self.indptr))
+
+        pass
+
+    def get_member_edges(self, districts: np.ndarray) -> np.ndarray:
+        # return the positions (at indices and costs arrays)
+        # of the neighbourhood edges that start at 'districts'
+
+        starts = self.indptr[districts]
+        lengths = self.indptr[districts + 1] - starts
+        n_edges = int(lengths.sum())
+
+        # for each edge, its offset from its district CSR row start
+        offsets = np.arange(n_edges) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+        edges = np.repeat(starts, lengths) + offsets
+
+        return edges
+
+    def zone_aggregates(self, assignments: np.ndarray, num_zones: int) -> (np.ndarray, np.ndarray, np.ndarray):
+        """
+        Compute the aggregates of every zone of a batch of partitions
+        with a few vectorized passes
+
+        - the total value of each zone
+        - the mean connectivity cost of each zone: the average of the cost
+          of the neighbourhood edges whose both ends are at the zone
+        - the number of unconnected parts of each zone
+          (its number of connected components minus one)
+
+        :param assignments: (num_partitions, num_districts) array with the
+            zone of each district at each partition (or a single partition vector)
+        :param num_zones: the number of zones of the partitions
+        :return: three (num_partitions, num_zones) arrays: values, mean costs and unconnected parts
+        """
+
+        assignments = np.atleast_2d(assignments)
+        num_partitions = assignments.shape[0]
+        n_keys = num_partitions * num_zones
+
+        # a unique key for each zone of each partition
+        keys = assignments + (np.arange(num_partitions) * num_zones)[:, np.newaxis]
+
+        # zones values
+        zone_values = np.bincount(keys.ravel(), weights=np.tile(self.values, num_partitions),
+                                  minlength=n_keys).reshape(num_partitions, num_zones)
+        # the sum of integer values must be an integer
+        if np.issubdtype(self.values.dtype, np.integer):
+            zone_values = zone_values.astype(self.values.dtype)
+
+        # the neighbourhood edges whose both ends are at the same zone
+        src_keys = keys[:, self.edge_src]
+        in_partition, in_edge = np.nonzero(src_keys == keys[:, self.indices])
+        in_keys = src_keys[in_partition, in_edge]
+
+        # zones mean connectivity cost
+        total_cost = np.bincount(in_keys, weights=self.costs[in_edge], minlength=n_keys)
+        total_connections = np.bincount(in_keys, minlength=n_keys)
+        # assign a mean_cost value to 1-district zones
+        # or zones with all its districts unconnected
+        mean_costs = np.full(n_keys, our.GA_1_DISTRICT_ZONE_MEAN_COST)
+        connected = total_connections > 0
+        mean_costs[connected] = total_cost[connected] / total_connections[connected]
+        mean_costs = mean_costs.reshape(num_partitions, num_zones)
+
+        # zones connected components:
+        # each district of each partition is a node,
+        # and they are linked by the edges inside its zone
+        offsets = in_partition * self.num_districts
+        labels = connected_components(num_nodes=num_partitions * self.num_districts,
+                                      src=offsets + self.edge_src[in_edge],
+                                      dst=offsets + self.indices[in_edge])
+        # there are as many components as root nodes
+        is_root = labels == np.arange(len(labels))
+        components = np.bincount(keys.ravel()[is_root], minlength=n_keys)
+        zone_unconnected = np.maximum(components - 1, 0).reshape(num_partitions, num_zones)
+
+        return zone_values, mean_costs, zone_unconnected
+
+    def zone_aggregates_of(self, assignment: np.ndarray, zone_ids: np.ndarray,
+                           num_zones: int) -> (np.ndarray, np.ndarray, np.ndarray):
+        """
+        Compute the aggregates (see zone_aggregates) of some zones of a partition
+        only visiting its districts and neighbourhood edges.
+        The results are exactly the same than the zone_aggregates ones
+
+        :param assignment: the zone of each district of the partition
+        :param zone_ids: the zones to compute
+        :param num_zones: the number of zones of the partition
+        :return: three arrays (values, mean costs and unconnected parts) in 'zone_ids' order
+        """
+
+        n_zones = len(zone_ids)
+
+        # position of each zone at zone_ids (-1 for not computed zones)
+        zone_pos = np.full(num_zones, -1, dtype=np.int64)
+        zone_pos[zone_ids] = np.arange(n_zones)
+
+        # the districts of the zones to compute
+        members = np.flatnonzero(zone_pos[assignment] >= 0)
+        member_keys = zone_pos[assignment[members]]
+
+        # zones values
+        zone_values = np.bincount(member_keys, weights=self.values[members], minlength=n_zones)
+        # the sum of integer values must be an integer
+        if np.issubdtype(self.values.dtype, np.integer):
+            zone_values = zone_values.astype(self.values.dtype)
+
+        # the neighbourhood edges of our districts whose both ends are at the same zone
+        edges = self.get_member_edges(members)
+        src_zone = assignment[self.edge_src[edges]]
+        inside = src_zone == assignment[self.indices[edges]]
+        in_edges = edges[inside]
+        in_keys = zone_pos[src_zone[inside]]
+
+        # zones mean connectivity cost
+        total_cost = np.bincount(in_keys, weights=self.costs[in_edges], minlength=n_zones)
+        total_connections = np.bincount(in_keys, minlength=n_zones)
+        mean_costs = np.full(n_zones, our.GA_1_DISTRICT_ZONE_MEAN_COST)
+        connected = total_connections > 0
+        mean_costs[connected] = total_cost[connected] / total_connections[connected]
+
+        # zones connected components, renumbering our districts
+        local = np.full(self.num_districts, -1, dtype=np.int64)
+        local[members] = np.arange(len(members))
+        labels = connected_components(num_nodes=len(members),
+                                      src=local[self.edge_src[in_edges]],
+                                      dst=local[self.indices[in_edges]])
+        is_root = labels == np.arange(len(members))
+        components = np.bincount(member_keys[is_root], minlength=n_zones)
+        zone_unconnected = np.maximum(components - 1, 0)
+
+        return zone_values, mean_costs, zone_unconnected
+
+    def center_distances(self, centers: np.ndarray, districts: np.ndarray = None) -> np.ndarray:
+        # return the (num_districts, num_centers) matrix of distances
+        # from each district centroid to each one of the 'centers'
+        # ((num_centers, 2) array of coordinates)
+        # or only from the 'districts' centroids, if given
+        #
+        # it is computed the same way than shapely Point.distance()
+        # (to obtain exactly the same values)
+
+        centroids = self.centroids if districts is None else self.centroids[districts]
+
+        dx = centroids[:, 0, np.newaxis] - centers[np.newaxis, :, 0]
+        dy = centroids[:, 1, np.newaxis] - centers[np.newaxis, :, 1]
+
+        distances = np.sqrt(dx * dx + dy * dy)
+
+        return distances
+
+    def nearest_centers(self, centers: np.ndarray, districts: np.ndarray = None) -> (np.ndarray, np.ndarray):
+        """
+        Search the nearest center of each district centroid
+        (or only of the 'districts' ones, if given) with a KD-tree of the centers,
+        so the cost grows as districts x log(centers) instead of districts x centers.
+        The results are the same than the argmin of center_distances:
+        the our.GA_KDTREE_NEIGHBOURS nearest centers found by the tree
+        are measured again the same way, and the first one (the lowest position)
+        wins the ties (unless more centers are at exactly the same distance)
+
+        :param centers: (num_centers, 2) array of coordinates
+        :param districts: the districts positions, or None for all of them
+        :return: the position of the nearest center of each district, and its distance
+        """
+
+        if not kdtree_available():
+            raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+        centroids = self.centroids if districts is None else self.centroids[districts]
+
+        # the few nearest centers, in ascending position order
+        k = min(our.GA_KDTREE_NEIGHBOURS, len(centers))
+        _, candidates = cKDTree(centers).query(centroids, k=k)
+        candidates = np.sort(candidates.reshape(len(centroids), k), axis=1)
+
+        # measured again as center_distances does
+        dx = centroids[:, 0, np.newaxis] - centers[candidates, 0]
+        dy = centroids[:, 1, np.newaxis] - centers[candidates, 1]
+        distances = np.sqrt(dx * dx + dy * dy)
+
+        best = np.argmin(distances, axis=1)
+        rows = np.arange(len(centroids))
+
+        return candidates[rows, best], distances[rows, best]
+
+
+def kdtree_available() -> bool:
+    # return True if the nearest centers
+    # can be searched with a KD-tree (scipy is installed)
+
+    return cKDTree is not None
+
+
+def connected_components(num_nodes: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """
+    Compute the connected components of an undirected graph
+    without recursion, using vectorized union-find rounds:
+    each round hooks every root to the lowest root it is linked to,
+    and then flattens the trees (pointer jumping).
+    There are about log(num_nodes) rounds
+
+    :param num_nodes: the number of nodes
+    :param src: the edges source nodes
+    :param dst: the edges destination nodes
+    :return: the label of each node: the lowest node of its component
+    """
+
+    labels = np.arange(num_nodes)
+
+    while True:
+        # flatten the trees,
+        # so every label is a root
+        while True:
+            grand_labels = labels[labels]
+            if np.array_equal(grand_labels, labels):
+                break
+            labels = grand_labels
+
+        # the edges between different trees
+        src_labels = labels[src]
+        dst_labels = labels[dst]
+        between = src_labels != dst_labels
+        if not between.any():
+            break
+
+        # the edges into a tree will always be
+        src = src[between]
+        dst = dst[between]
+        src_labels = src_labels[between]
+        dst_labels = dst_labels[between]
+
+        # hook the highest root to the lowest one
+        np.minimum.at(labels, np.maximum(src_labels, dst_labels), np.minimum(src_labels, dst_labels))
+
+    return labels
@@ -0,0 +1,124 @@
+# Pràctica de creació de zones electorals per algorismes genètics
+#
+# IC - MUSI 21 22 - UIB
+#
+# Alumne: Lluís Bernat Ladaria
+
+"""
+FitnessCache class - library
+"""
+
+#
+# system libraries
+#
+
+import hashlib
+import numpy as np
+
+#
+# ours libraries
+#
+
+from mt_LRUCache import LRUCache
+
+
+def get_assignment_key(assignment: np.ndarray, num_zones: int) -> (bytes, np.ndarray):
+    """
+    Compute a canonical key of a partition assignment vector
+    (the zone of each district), invariant to zone relabelling:
+    the zones are renumbered in order of first appearance
+    and the renumbered vector is hashed
+
+    :param assignment: the zone of each district
+    :param num_zones: the number of zones of the partition
+    :return: the key and the zones in canonical order
+        (the not empty zones by first appearance, then the empty ones)
+    """
+
+    # the first district of each zone
+    first_district = np.full(num_zones, len(assignment), dtype=np.int64)
+    np.minimum.at(first_district, assignment, np.arange(len(assignment)))
+
+    # canonical zones order (stable, so the empty zones are sorted at the end)
+    zone_order = np.argsort(first_district, kind='stable')
+
+    # renumber the zones
+    canonical_label = np.empty(num_zones, dtype=np.int32)
+    canonical_label[zone_order] = np.arange(num_zones, dtype=np.int32)
+
+    key = hashlib.blake2b(canonical_label[assignment].tobytes(), digest_size=16).digest()
+
+    return key, zone_order
+
+
+class FitnessCache:
+    """
+    Class that encapsulates a cache of partition evaluations
+
+    Different genotypes often decode to the same partition
+    (the same districts grouped the same way),
+    especially once the population converges.
+    This cache maps the canonical key of a partition assignment
+    (see get_assignment_key) to its score and its zones aggregates
+    (values, mean connectivity costs and unconnected parts) in canonical order,
+    so an already seen partition is not evaluated again.
+    The least recently used entries are evicted when
+    'capacity' entries are reached
+
+    :param capacity: max number of cached evaluations
+    """
+
+    def __init__(self, capacity: int):
+        # create the cache instance
+        #
+
+        # {key: (score, zone_values, zone_costs, zone_unconnected)}
+        self._entries = LRUCache(capacity=capacity)
+
+        pass
+
+    def get(self, key: bytes, zone_order: np.ndarray):
+        # return the cached evaluation of the 'key' partition:
+        # (score, zone_values, zone_costs, zone_unconnected)
+        # with the zones aggregates in the partition zones order,
+        # or None if not cached
+
+        entry = self._entries.get(key)
+
+        if entry is None:
+            return None
+
+        score, canonical_values, canonical_costs, canonical_unconnected = entry
+
+        zone_values = np.empty_like(canonical_values)
+        zone_values[zone_order] = canonical_values
+        zone_costs = np.empty_like(canonical_costs)
+        zone_costs[zone_order] = canonical_costs
+        zone_unconnected = np.empty_like(canonical_unconnected)
+        zone_unconnected[zone_order] = canonical_unconnected
+
+        return score, zone_values, zone_costs, zone_unconnected
+
+    def put(self, key: bytes, zone_order: np.ndarray, score: float,
+            zone_values: np.ndarray, zone_costs: np.ndarray, zone_unconnected: np.ndarray):
+        # save the evaluation of the 'key' partition
+        # the zones aggregates are in the partition zones order
+
+        self._entries.put(key, (score, zone_values[zone_order], zone_costs[zone_order],
+                                zone_unconnected[zone_order]))
+
+        pass
+
+    def add_lookups(self, hits: int, misses: int):
+        # count the lookups made at a worker process copy of this cache
+        # (see PartitionDesigner._take_worker_results)
+
+        self._entries.add_lookups(hits=hits, misses=misses)
+
+        pass
+
+    def get_stats(self) -> (int, int, int, float):
+        # return the cache statistics:
+        # hits, misses, evictions and hit rate
+
+        return self._entries.get_stats()
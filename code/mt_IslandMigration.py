@@ -0,0 +1,85 @@
+# Pràctica de creació de zones electorals per algorismes genètics
+#
+# IC - MUSI 21 22 - UIB
+#
+# Alumne: Lluís Bernat Ladaria
+
+"""
+IslandMigration class - library
+"""
+
+#
+# system libraries
+#
+
+import queue
+
+#
+# ours libraries
+#
+
+import mt_common as our
+
+
+class IslandMigration:
+    """
+    Class that encapsulates the migration channels of an island
+    of an island model GA
+
+    Each island is a PartitionDesigner running at its own process.
+    The islands are connected as a ring: each GA_MIGRATION_INTERVAL
+    iterations (see PartitionDesigner.fit), every island sends
+    the genotypes of its GA_MIGRANTS best partitions (the zone centers
+    coordinates, a few bytes) to the next island, and takes
+    the genotypes that the previous island has sent to it.
+    The exchange never waits: an island only takes
+    the genotypes that have already arrived,
+    so the islands don't need to run at the same pace
+    (or the same number of iterations)
+
+    :param inbox: the queue where the previous island sends its genotypes
+    :param outbox: the queue where to send our genotypes (the next island inbox)
+    :param n_migrants: how many genotypes are sent at each exchange
+    """
+
+    def __init__(self, inbox, outbox, n_migrants: int = our.GA_MIGRANTS):
+        # create the migration instance
+        #
+
+        if type(n_migrants) is not int or n_migrants < 1:
+            raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+        self._inbox = inbox
+        self._outbox = outbox
+        self._n_migrants = n_migrants
+
+        # the next island can finish without reading our last genotypes,
+        # don't wait for them to be delivered when this process exits
+        self._outbox.cancel_join_thread()
+
+        # statistics
+        self.sent = 0
+        self.received = 0
+
+        pass
+
+    def exchange(self, designer):
+        # send the best genotypes of the 'designer' PartitionDesigner
+        # to the next island, and give it the ones received
+        # from the previous island
+
+        genotypes = designer.get_best_genotypes(n=self._n_migrants)
+        self._outbox.put(genotypes)
+        self.sent += len(genotypes)
+
+        received = list()
+        while True:
+            try:
+                received.extend(self._inbox.get_nowait())
+            except queue.Empty:
+                break
+
+        designer.receive_genotypes(genotypes=received)
+        self.received += len(received)
+
+        pass
@@ -0,0 +1,106 @@
+# Pràctica de creació de zones electorals per algorismes genètics
+#
+# IC - MUSI 21 22 - UIB
+#
+# Alumne: Lluís Bernat Ladaria
+
+"""
+LRUCache class - library
+"""
+
+#
+# system libraries
+#
+
+from collections import OrderedDict
+
+#
+# ours libraries
+#
+
+import mt_common as our
+
+
+class LRUCache:
+    """
+    Class that encapsulates a least recently used cache
+
+    It maps any hashable key to any value,
+    and it counts its hits, misses and evictions.
+    The least recently used entries are evicted when
+    'capacity' entries are reached.
+    It is the store of the GA caches
+    (see mt_DistanceCache.py, mt_FitnessCache.py and mt_ZoneCache.py)
+
+    :param capacity: max number of cached entries
+    """
+
+    def __init__(self, capacity: int):
+        # create the cache instance
+        #
+
+        if type(capacity) is not int or capacity < 1:
+            raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+        self._capacity = capacity
+
+        # {key: value}, in least recently used order
+        self._entries = OrderedDict()
+
+        # statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        pass
+
+    def get_capacity(self) -> int:
+        # return the max number of cached entries
+        #
+
+        return self._capacity
+
+    def get(self, key):
+        # return the cached value of the 'key'
+        # or None if not cached
+
+        value = self._entries.get(key)
+
+        if value is None:
+            self.misses += 1
+        else:
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        return value
+
+    def put(self, key, value):
+        # save the 'value' of the 'key'
+        # making room, the least recently used first
+
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+        pass
+
+    def add_lookups(self, hits: int, misses: int):
+        # count the 'hits' and 'misses' of the lookups
+        # made at another copy of this cache (at a worker process)
+
+        self.hits += hits
+        self.misses += misses
+
+        pass
+
+    def get_stats(self) -> (int, int, int, float):
+        # return the cache statistics:
+        # hits, misses, evictions and hit rate
+
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups > 0 else 0.
+
+        return self.hits, self.misses, self.evictions, hit_rate
@@ -0,0 +1,136 @@
+# Pràctica de creació de zones electorals per algorismes genètics
+#
+# IC - MUSI 21 22 - UIB
+#
+# Alumne: Lluís Bernat Ladaria
+
+"""
+MapRenderer class - library
+"""
+
+#
+# system libraries
+#
+
+import logging as log
+import multiprocessing as mp
+import queue
+
+#
+# ours libraries
+#
+
+import mt_common as our
+
+
+def _render_loop(render, snapshots, logger: log.Logger):
+    # render the 'snapshots' queue items, until the end mark (None)
+    # at the render process
+
+    while True:
+        snapshot = snapshots.get()
+        if snapshot is None:
+            break
+        try:
+            render(snapshot)
+        except Exception:
+            # a failed map must not stop the rest of them
+            logger.exception(our.MG_ERROR_RENDER)
+
+    pass
+
+
+class MapRenderer:
+    """
+    Class that encapsulates a background map render process
+
+    The GA hands snapshots of its best partition (see submit)
+    to a forked process, through a bounded queue,
+    so it never waits for the maps to be plotted and saved.
+    When the render process falls behind and the queue is full,
+    the last snapshot waits at this side, and it is replaced
+    by the next one (the intermediate maps are skipped).
+    Closing the renderer (see close) sends the waiting snapshot,
+    and waits for every queued map to be saved.
+    After an error, the render process is terminated (see terminate),
+    and as a daemonic process, it never outlives its parent
+
+    :param render: the function that renders a snapshot
+        (called at the forked render process)
+    :param logger: a Logger object
+    :param queue_size: max number of queued snapshots
+    """
+
+    def __init__(self, render, logger: log.Logger, queue_size: int = our.GA_RENDER_QUEUE_SIZE):
+        # create the renderer instance
+        # and fork the render process
+
+        if type(queue_size) is not int or queue_size < 1:
+            raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+        context = mp.get_context('fork')
+
+        self._snapshots = context.Queue(maxsize=queue_size)
+
+        # the snapshot waiting for room at the queue
+        self._pending = None
+
+        # statistics
+        self.submitted = 0
+        self.coalesced = 0
+
+        self._process = context.Process(target=_render_loop, args=(render, self._snapshots, logger),
+                                        daemon=True)
+        self._process.start()
+
+        pass
+
+    def submit(self, snapshot: dict):
+        # hand the 'snapshot' to the render process
+        # never waiting: if the queue is full, it replaces the waiting one
+
+        if self._pending is not None:
+            self.coalesced += 1
+
+        self._pending = snapshot
+        self.submitted += 1
+
+        try:
+            self._snapshots.put_nowait(self._pending)
+            self._pending = None
+        except queue.Full:
+            pass
+
+        pass
+
+    def close(self):
+        # send the waiting snapshot, if any, and the end mark
+        # then wait for the render process to save all the maps
+
+        if self._pending is not None:
+            self._snapshots.put(self._pending)
+            self._pending = None
+
+        self._snapshots.put(None)
+        self._process.join()
+
+        pass
+
+    def terminate(self):
+        # stop the render process at once
+        # discarding the waiting and the queued snapshots
+
+        self._pending = None
+
+        # do not wait to flush the queued snapshots on exit
+        self._snapshots.cancel_join_thread()
+        self._process.terminate()
+        self._process.join()
+
+        pass
+
+    def get_stats(self) -> (int, int):
+        # return the renderer statistics:
+        # submitted and coalesced (skipped) snapshots
+
+        return self.submitted, self.coalesced
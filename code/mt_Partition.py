@@ -23,6 +23,11 @@ import numpy as np
 #
 
 from mt_Zone import Zone
+from mt_DistrictModel import DistrictModel, kdtree_available
+from mt_DistanceCache import DistanceCache
+from mt_ZoneCache import ZoneCache, get_members_key
+from mt_PointSampler import PointSampler
+from mt_CenterCandidates import CenterCandidates
 import mt_common as our
 
 
@@ -37,15 +42,14 @@ def _calc_lower_upper_bound(mean: float) -> (float, float):
     return lower_bound, upper_bound
 
 
-def _calc_value_deviation_score(value: float, mean: float, margin: float):
+def _calc_value_deviation_scores(values: np.ndarray, mean: float, margin: float) -> np.ndarray:
     # calculate the score of the population deviation respect to the mean
-    # taking margin into account
+    # of every one of the 'values' (a numpy array), taking margin into account
 
-    try:
-        ratio_1 = value / mean - 1
-
-    except ZeroDivisionError:
-        ratio_1 = 0
+    if mean != 0:
+        ratio_1 = values / mean - 1
+    else:
+        ratio_1 = np.zeros(np.shape(values))
 
     if margin != 0:
         # if there are tolerance margin for population value
@@ -57,23 +61,41 @@ def _calc_value_deviation_score(value: float, mean: float, margin: float):
         #
         # the function that accomplish the above conditions is:
         # f(value) = [ (value / mean - 1) / margin ]^2
-
-        if -margin < ratio_1 < margin:
-            # when the zone value is into margin boundaries,
-            # reduce calculated deviation cost using GA_INTO_MARGIN_REDUCTION,
-            # to promote the connectivity cost (weighted by GA_MEAN_ZONE_COST_WEIGHT)
-            # this way we spect that the zones will get a more compact shape
-            score = our.GA_INTO_MARGIN_REDUCTION * ratio_1 / margin * ratio_1 / margin
-        else:
-            score = ratio_1 / margin * ratio_1 / margin
+        #
+        # when the zone value is into margin boundaries,
+        # reduce calculated deviation cost using GA_INTO_MARGIN_REDUCTION,
+        # to promote the connectivity cost (weighted by GA_MEAN_ZONE_COST_WEIGHT)
+        # this way we spect that the zones will get a more compact shape
+        scores = np.where((-margin < ratio_1) & (ratio_1 < margin),
+                          our.GA_INTO_MARGIN_REDUCTION * ratio_1 / margin * ratio_1 / margin,
+                          ratio_1 / margin * ratio_1 / margin)
 
     else:
         # if there are no margin,
         # we use the absolute value
 
-        score = abs(ratio_1)
+        scores = np.abs(ratio_1)
+
+    return scores
+
+
+def calc_partition_scores(zone_values: np.ndarray, zone_costs: np.ndarray, zone_unconnected: np.ndarray,
+                          mean: float, num_zones: int) -> np.ndarray:
+    # calculate the score of a batch of partitions
+    # from its zones aggregates ((num_partitions, num_zones) arrays)
+    #
+    # zone_score = (dev_score(zone_value, mean) + zone_cost + w * zone_unconnected) / num_zones
+    # and the partition score is the sum of its zones scores
+
+    zone_deviations = _calc_value_deviation_scores(values=zone_values, mean=mean,
+                                                   margin=our.GA_MARGIN_ZONE_VALUE)
+
+    zone_scores = (zone_deviations + zone_costs +
+                   our.GA_UNCONNECTED_ZONE_WEIGHT * zone_unconnected) / num_zones
 
-    return score
+    scores = zone_scores.sum(axis=-1)
+
+    return scores
 
 
 class Partition:
@@ -82,41 +104,105 @@ class Partition:
     and all the necessary methods to work with
 
     A partition is a list of zones that covers a region map
+    The districts to be zoned are described by
+    a DistrictModel (see mt_DistrictModel.py)
+    When a DistanceCache is given, the zone centers distances columns
+    are taken from it (see mt_DistanceCache.py)
+    When a ZoneCache is given, the aggregates of the already seen zones
+    are taken from it (see mt_ZoneCache.py)
+    When a PointSampler is given, the new zone centers
+    are taken from it (see mt_PointSampler.py)
+    When a CenterCandidates set is given, the zone centers are
+    some of its candidates, and its distances are looked up
+    at its precomputed table (see mt_CenterCandidates.py)
+
+    A partition can inherit the decoded and evaluated state of a parent
+    (see inherit_state). Then, only the genes (zone centers) changed since
+    that state are decoded again, and only the zones that gained or lost
+    districts are evaluated again
+
+    During the GA, only the assignment vector and the zones aggregates
+    are kept. The Zone instances are only created when they are needed
+    (see get_zones)
     """
 
-    def __init__(self, data: list, mean_value: float, geodata: dict,
+    __slots__ = ('model', 'distance_cache', 'zone_cache', 'point_sampler', 'candidates',
+                 'mean_value', 'valid_area', 'num_zones', 'logger', 'num_districts',
+                 'x_min', 'y_min', 'x_max', 'y_max',
+                 'genotype', '_zones', 'assignment', 'center_distances',
+                 'zone_values', 'zone_costs', 'zone_unconnected',
+                 '_changed_genes', '_touched_zones', 'score')
+
+    def __init__(self, model: DistrictModel, mean_value: float,
                  valid_area: BaseGeometry,
-                 num_zones: int, logger: log.Logger):
+                 num_zones: int, logger: log.Logger,
+                 distance_cache: DistanceCache = None,
+                 zone_cache: ZoneCache = None,
+                 point_sampler: PointSampler = None,
+                 candidates: CenterCandidates = None,
+                 bounds: tuple = None):
         # create an instance of the partition genotype
-        #
+        # 'bounds' are the valid_area bounds, if already known
 
         # save parameters
-        self.data = data
+        self.model = model
+        self.distance_cache = distance_cache
+        self.zone_cache = zone_cache
+        self.point_sampler = point_sampler
+        self.candidates = candidates
         self.mean_value = mean_value
-        self.geodata = geodata
         self.valid_area = valid_area
         self.num_zones = num_zones
         self.logger = logger
 
         # calculate number of districts to fit
-        num_districts = len(data)
+        num_districts = model.num_districts
         self.num_districts = num_districts
 
         # say hello
-        self.logger.debug(
-            our.MG_INFO_PARTITION_INIT.format(
-                self.num_districts, self.num_zones, self.mean_value))
+        if self.logger.isEnabledFor(log.DEBUG):
+            self.logger.debug(
+                our.MG_INFO_PARTITION_INIT.format(
+                    self.num_districts, self.num_zones, self.mean_value))
 
         # calc cartesian boundaries (the smaller rectangle that contains the map)
-        [self.x_min, self.y_min, self.x_max, self.y_max] = \
-            self.valid_area.bounds
+        if bounds is None:
+            bounds = self.valid_area.bounds
+        [self.x_min, self.y_min, self.x_max, self.y_max] = bounds
+
+        self.reset()
+
+        pass
+
+    def reset(self):
+        # forget the genotype and everything computed from it
+        # so the instance can be reused as a new (empty) partition
 
         # our list of zone centers
         self.genotype = list()
 
         # our list of zones
-        # will be populated at compose_partition() method execution
-        self.zones = list()
+        # will be populated when needed (see get_zones)
+        self._zones = None
+
+        # the zone (position at zones list) of each district
+        # and its distance to the zone center
+        # will be computed at compose_partition() method execution
+        self.assignment = None
+        self.center_distances = None
+
+        # the zones aggregates: values, mean connectivity costs
+        # and number of unconnected parts
+        # will be computed at evaluate() method execution
+        self.zone_values = None
+        self.zone_costs = None
+        self.zone_unconnected = None
+
+        # the genes (positions) changed since the last compose_partition()
+        self._changed_genes = set()
+        # the zones whose districts changed at the last compose_partition()
+        # (None if all of them must be evaluated)
+        self._touched_zones = None
 
         # our solution score
         self.score = None
@@ -140,36 +226,36 @@ class Partition:
 
         return self.genotype
 
+    def get_centers_array(self) -> np.ndarray:
+        # return the genotype as a (num_zones, 2) array
+        # of the zone centers coordinates
+
+        centers = np.array([(p.x, p.y) for p in self.genotype], dtype=float).reshape(-1, 2)
+
+        return centers
+
     def get_zones(self):
         # return the zones list
         # each zone object has a district's dictionary with its districts info
+        # the zones are created the first time they are needed
+
+        if self._zones is None:
+            self._build_zones()
 
-        return self.zones
+        return self._zones
 
     def get_district_code_zone_id_lists(self):
         # return two list:
         # - a list of district codes
         # - a list with a unique integer for each defined zone at first district codes list
 
-        # construct district codes list
-        district_code_list = [dis[our.LIST_DATA_CODE_COL] for dis in self.data]
-
-        # reserve num_districts integer positions, initialized to -1 value
-        district_zone_id = np.ones(self.num_districts, dtype=int) * (-1)
-
-        # for each conformed zone ...
-        for i, zon in enumerate(self.zones):
-            # get its districts list
-            zone_district_code_list = zon.get_districts_codes()
-            for dis_code in zone_district_code_list:
-                # search each code position
-                pos = district_code_list.index(dis_code)
-                district_zone_id[pos] = i
-
-        if -1 in district_zone_id:
+        if self.assignment is None:
             raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
 
-        return district_code_list, list(district_zone_id)
+        # construct district codes list
+        district_code_list = list(self.model.codes)
+
+        return district_code_list, list(self.assignment)
 
     def generate_genotype(self):
         # generate as many zone centers as num_zones value
@@ -193,6 +279,15 @@ class Partition:
         # (a no repeated point that is contained
         # into the study region)
 
+        if self.point_sampler is not None:
+            # the sampler points are already into the study region
+            # but must be unique to this instance
+            used = {(q.x, q.y) for q in self.genotype}
+            p = self.point_sampler.next_point()
+            while (p.x, p.y) in used:
+                p = self.point_sampler.next_point()
+            return p
+
         p = self._generate_point()
 
         # the point must be into the study region
@@ -217,79 +312,291 @@ class Partition:
 
         return p
 
+    def inherit_state(self, parent):
+        # take the decoded and evaluated state of the 'parent' Partition,
+        # so only the genes that differs from the parent ones
+        # must be decoded (see compose_partition)
+        # the genotype must be already set
+
+        if parent.assignment is None or parent.zone_values is None or \
+                len(self.genotype) != len(parent.genotype):
+            # nothing to inherit
+            return
+
+        # the arrays are never modified in place, so they can be shared
+        self.assignment = parent.assignment
+        self.center_distances = parent.center_distances
+        self.zone_values = parent.zone_values
+        self.zone_costs = parent.zone_costs
+        self.zone_unconnected = parent.zone_unconnected
+
+        self._changed_genes = {
+            i for i, (p, q) in enumerate(zip(self.genotype, parent.genotype))
+            if p is not q and (p.x, p.y) != (q.x, q.y)}
+
+        pass
+
+    def _get_distances(self, centers: np.ndarray, districts: np.ndarray = None) -> np.ndarray:
+        # return the matrix with the distances
+        # from each district centroid (or the 'districts' ones) to each one of the 'centers'
+
+        if self.candidates is not None:
+            distances = self.candidates.get_distances(centers=centers, districts=districts)
+        elif self.distance_cache is not None:
+            distances = self.distance_cache.get_distances(centers=centers, districts=districts)
+        else:
+            distances = self.model.center_distances(centers=centers, districts=districts)
+
+        return distances
+
+    def _nearest_centers(self, centers: np.ndarray, districts: np.ndarray = None) -> (np.ndarray, np.ndarray):
+        # return the position of the nearest zone center
+        # of each district (or of the 'districts' ones) and its distance
+        #
+        # with many zones, a KD-tree of the centers is faster
+        # than computing the distances to every center
+
+        if len(centers) >= our.GA_KDTREE_MIN_ZONES and kdtree_available():
+            nearest, distances = self.model.nearest_centers(centers=centers, districts=districts)
+        else:
+            # compute the matrix with the distances
+            # from each district centroid to each zone center
+            zone_distances = self._get_distances(centers=centers, districts=districts)
+            nearest = np.argmin(zone_distances, axis=1)
+            distances = zone_distances[np.arange(len(nearest)), nearest]
+
+        return nearest, distances
+
     def compose_partition(self):
         # for each district, locate the nearest
         # zone future centroid and add it
         # to this zone string
 
-        # initially the zone list must be empty
-        if type(self.zones) != list or len(self.zones) > 0:
+        # initially there must be no zones
+        if self._zones is not None:
             raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
 
-        # populate the zones instances list
-        # each one with a genotype center point
-        for center in self.genotype:
-            new_zone = Zone(center=center, logger=self.logger)
-            self.zones.append(new_zone)
-
         # assign each district to the nearest zone center
         # using the district centroid to zone center distance
+        if self.assignment is None or len(self._changed_genes) >= self.num_zones:
+            self._compose_all()
+        elif len(self._changed_genes) > 0:
+            self._compose_changed()
+        else:
+            # nothing changed
+            self._touched_zones = np.empty(0, dtype=np.int64)
+
+        self._changed_genes = set()
+
+        pass
+
+    def _compose_all(self):
+        # assign every district to the nearest zone center
+
+        # search the nearest zone center
+        # (the first one, if there are more than one at the same distance)
+        self.assignment, self.center_distances = self._nearest_centers(centers=self.get_centers_array())
+
+        # all the zones must be evaluated
+        self._touched_zones = None
+
+        pass
+
+    def _compose_changed(self):
+        # reassign only the districts whose nearest
+        # zone center can be a changed one
+        # the result is exactly the same than _compose_all() one
+
+        changed = np.array(sorted(self._changed_genes), dtype=np.int64)
+        centers = self.get_centers_array()
+
+        assignment = self.assignment.copy()
+        center_distances = self.center_distances.copy()
+
+        # the districts whose zone center has changed
+        # must search again its nearest zone center
+        is_moved = np.isin(self.assignment, changed)
+        moved = np.flatnonzero(is_moved)
+        if len(moved) > 0:
+            assignment[moved], center_distances[moved] = self._nearest_centers(centers=centers, districts=moved)
+
+        # the rest of the districts keep the same zone center
+        # unless a changed zone center is nearer
+        # (or at the same distance but it's first)
+        stay = np.flatnonzero(~is_moved)
+        if len(stay) > 0:
+            changed_distances = self._get_distances(centers=centers[changed], districts=stay)
+            nearest_changed = np.argmin(changed_distances, axis=1)
+            new_distances = changed_distances[np.arange(len(stay)), nearest_changed]
+            new_zones = changed[nearest_changed]
+            old_distances = self.center_distances[stay]
+            is_nearer = (new_distances < old_distances) | \
+                        ((new_distances == old_distances) & (new_zones < self.assignment[stay]))
+            assignment[stay[is_nearer]] = new_zones[is_nearer]
+            center_distances[stay[is_nearer]] = new_distances[is_nearer]
+
+        # the zones that gained or lost districts
+        is_reassigned = assignment != self.assignment
+        self._touched_zones = np.union1d(self.assignment[is_reassigned], assignment[is_reassigned])
+
+        self.assignment = assignment
+        self.center_distances = center_distances
+
+        pass
+
+    def _build_zones(self):
+        # populate the zones instances list
+        # from the assignment vector
+        # each one with a genotype center point and its districts
+
+        if self.assignment is None:
+            raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+        self._zones = list()
+
+        # group the districts by zone (keeping its order)
+        order = np.argsort(self.assignment, kind='stable')
+        zone_sizes = np.bincount(self.assignment, minlength=self.num_zones)
+        zone_districts = np.split(order, np.cumsum(zone_sizes)[:-1])
 
-        for district in self.data:
-            # retrieve district interesting data
-            dis_code = district[our.LIST_DATA_CODE_COL]
-            dis_value = district[our.LIST_DATA_VALUE_COL]
-            dis_geodata = self.geodata.get(dis_code)
-            dis_centroid = Point(dis_geodata[our.DICT_DISTRICT_CENTROID_POINT])
+        for i, center in enumerate(self.genotype):
+            new_zone = Zone(center=center, logger=self.logger, model=self.model, zone_id=i)
+            new_zone.add_districts(districts=zone_districts[i],
+                                   center_distances=self.center_distances[zone_districts[i]])
+            self._zones.append(new_zone)
 
-            # compute a numpy vector with the
-            # distances from the district centroid to each zone center
-            zone_distances = np.array(
-                [dis_centroid.distance(p) for p in self.genotype],
-                dtype=float)
+        # zones costs are known if they are up to date
+        if self.zone_costs is not None and not self.needs_full_evaluation() and len(self._touched_zones) == 0:
+            for zone, conn_cost, unconnected in zip(self._zones, self.zone_costs, self.zone_unconnected):
+                zone.set_cost(conn_cost=conn_cost, unconnected=unconnected)
 
-            # search the nearest zone center
-            zone_at = np.amin(zone_distances)
-            nearest_zone_index = \
-                np.where(zone_distances == zone_at)[0][0]
+        pass
+
+    def set_decoding(self, assignment: np.ndarray, center_distances: np.ndarray):
+        # set the zone of each district and its distance
+        # to the zone center, computed outside
+        # (instead of calling compose_partition)
+
+        if self._zones is not None or len(assignment) != self.num_districts:
+            raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+        self.assignment = assignment
+        self.center_distances = center_distances
 
-            nearest_zone: Zone = self.zones[nearest_zone_index]
-            nearest_zone.add_district(dis_code=dis_code, dis_value=dis_value, center_distance=zone_at,
-                                      dis_geodata=dis_geodata)
+        self._changed_genes = set()
+        # all the zones must be evaluated
+        self._touched_zones = None
 
         pass
 
+    def needs_full_evaluation(self) -> bool:
+        # return True if every zone must be evaluated
+        # (see evaluate)
+
+        return self._touched_zones is None or self.zone_values is None
+
     def evaluate(self):
         # calculate fitness function value
         # for whole partition
 
-        score = 0.
-
-        for zone in self.zones:
-            # calculate the connectivity cost of the zone
-            # and the number of unconnected parts
-            zone.calc_cost()
-            # get the zone mean connectivity cost
-            zone_cost = zone.get_cost()
-            # get the number of unconnected parts
-            zone_unconnected = zone.get_unconnected()
-            # get the zone value (total zone population)
-            zone_value = zone.get_value()
-            # compute deviation score
-            zone_deviation = \
-                _calc_value_deviation_score(value=zone_value, mean=self.mean_value,
-                                            margin=our.GA_MARGIN_ZONE_VALUE)
-            # calculate the partial score due to this zone configuration
-            # zone_score = dev_score(zone_value, self.mean_value) + zone_cost + w * zone_unconnected
-            zone_score = (zone_deviation + zone_cost +
-                          our.GA_UNCONNECTED_ZONE_WEIGHT * zone_unconnected) / self.num_zones
-            # carry zone score
-            score += zone_score
+        if self.needs_full_evaluation():
+            # calculate the zones values (total zone population),
+            # the connectivity cost of the zones
+            # and the number of unconnected parts,
+            # for all the zones at once
+            zone_values, zone_costs, zone_unconnected = \
+                self.model.zone_aggregates(assignments=self.assignment, num_zones=self.num_zones)
+            zone_values, zone_costs, zone_unconnected = zone_values[0], zone_costs[0], zone_unconnected[0]
+        else:
+            # calculate them only for the zones that have changed
+            zone_values = self.zone_values.copy()
+            zone_costs = self.zone_costs.copy()
+            zone_unconnected = self.zone_unconnected.copy()
+            touched = self._touched_zones
+            if len(touched) > 0 and self.zone_cache is not None:
+                self._evaluate_zones_cached(zone_values=zone_values, zone_costs=zone_costs,
+                                            zone_unconnected=zone_unconnected, zone_ids=touched)
+            elif len(touched) > 0:
+                zone_values[touched], zone_costs[touched], zone_unconnected[touched] = \
+                    self.model.zone_aggregates_of(assignment=self.assignment, zone_ids=touched,
+                                                  num_zones=self.num_zones)
+
+        # calculate the score as the sum of the partial scores due to each zone configuration
+        score = calc_partition_scores(zone_values=zone_values, zone_costs=zone_costs,
+                                      zone_unconnected=zone_unconnected,
+                                      mean=self.mean_value, num_zones=self.num_zones)
+
+        self.set_evaluation(zone_values=zone_values, zone_costs=zone_costs,
+                            zone_unconnected=zone_unconnected, score=score)
+
+        # a debug line
+        # self.get_zones()[0]._log_zone_dump()
+
+        pass
+
+    def _evaluate_zones_cached(self, zone_values: np.ndarray, zone_costs: np.ndarray,
+                               zone_unconnected: np.ndarray, zone_ids: np.ndarray):
+        # update the aggregates of the 'zone_ids' zones,
+        # taking the already seen zones ones from the zone cache
+        # and computing (and caching) only the rest
+
+        # group the districts of the zones to update (keeping its order)
+        zone_pos = np.full(self.num_zones, -1, dtype=np.int64)
+        zone_pos[zone_ids] = np.arange(len(zone_ids))
+        members = np.flatnonzero(zone_pos[self.assignment] >= 0)
+        member_keys = zone_pos[self.assignment[members]]
+        order = np.argsort(member_keys, kind='stable')
+        zone_sizes = np.bincount(member_keys, minlength=len(zone_ids))
+        zone_districts = np.split(members[order], np.cumsum(zone_sizes)[:-1])
+
+        missing = list()
+        missing_keys = list()
+
+        for k, (zone_id, districts) in enumerate(zip(zone_ids, zone_districts)):
+            key = get_members_key(districts)
+            cached = self.zone_cache.get(key)
+            if cached is not None:
+                zone_values[zone_id], zone_costs[zone_id], zone_unconnected[zone_id] = cached
+            else:
+                missing.append(k)
+                missing_keys.append(key)
+
+        if len(missing) > 0:
+            missing_ids = zone_ids[missing]
+            values, costs, unconnected = \
+                self.model.zone_aggregates_of(assignment=self.assignment, zone_ids=missing_ids,
+                                              num_zones=self.num_zones)
+            zone_values[missing_ids] = values
+            zone_costs[missing_ids] = costs
+            zone_unconnected[missing_ids] = unconnected
+
+            for key, value, conn_cost, unconn in zip(missing_keys, values, costs, unconnected):
+                self.zone_cache.put(key=key, value=value, conn_cost=conn_cost, unconnected=unconn)
+
+        pass
+
+    def set_evaluation(self, zone_values: np.ndarray, zone_costs: np.ndarray, zone_unconnected: np.ndarray,
+                       score: float):
+        # set the fitness function value
+        # and the zones aggregates, computed for all the zones at once
+        # (see DistrictModel.zone_aggregates)
+
+        if self.assignment is None:
+            raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+        self.zone_values = zone_values
+        self.zone_costs = zone_costs
+        self.zone_unconnected = zone_unconnected
+
+        # the zones, if already created
+        if self._zones is not None:
+            for zone, conn_cost, unconnected in zip(self._zones, zone_costs, zone_unconnected):
+                zone.set_cost(conn_cost=conn_cost, unconnected=unconnected)
 
         self.score = score
 
-        # a debug line
-        # self.zones[0]._log_zone_dump()
+        # everything is up to date
+        self._touched_zones = np.empty(0, dtype=np.int64)
 
         pass
 
@@ -305,6 +612,7 @@ class Partition:
                 new_p = self._generate_new_valid_point()
                 # replace
                 self.genotype[i] = new_p
+                self._changed_genes.add(i)
 
         pass
 
@@ -316,7 +624,7 @@ class Partition:
 
         serialized_partition = dict()
 
-        for ind, zon in enumerate(self.zones):
+        for ind, zon in enumerate(self.get_zones()):
 
             serialized_partition[ind] = zon.get_serialized_zone()
 
@@ -22,11 +22,15 @@ import matplotlib.pyplot as plt
 import matplotlib.colors as colors
 import numpy as np
 from shapely.geometry.base import BaseGeometry
+from shapely.geometry.point import Point
 from shapely.geometry.polygon import Polygon
 from shapely.geometry.multipolygon import MultiPolygon
 import logging as log
 import random
 import os
+import time
+import multiprocessing as mp
+import queue
 from datetime import datetime
 import json
 
@@ -35,7 +39,18 @@ import json
 #
 
 import mt_common as our
-from mt_Partition import Partition
+from mt_DistrictModel import DistrictModel
+from mt_DistanceCache import DistanceCache
+from mt_FitnessCache import FitnessCache, get_assignment_key
+from mt_ZoneCache import ZoneCache
+from mt_PointSampler import PointSampler
+from mt_CenterCandidates import CenterCandidates
+from mt_Partition import Partition, calc_partition_scores
+from mt_IslandMigration import IslandMigration
+from mt_MapRenderer import MapRenderer
+from mt_RasterRenderer import make_map_renderers, render_map, get_colors, save_png
+from mt_RunTrace import RunTrace
+from mt_Checkpoint import save_checkpoint, load_checkpoint
 
 
 #
@@ -64,6 +79,34 @@ def get_best_value_index(vector: list):
     return position
 
 
+def get_top_indices(scores: np.ndarray, k: int, reverse: bool = False) -> np.ndarray:
+    """
+    Return the positions of the 'k' lowest 'scores' (or the highest ones if 'reverse')
+    in ascending (descending) order, with a partial sort.
+    The result is the same than sorting the positions by score
+    (a stable sort, so the ties keep its original order) and taking the first 'k'
+
+    :param scores: the scores vector
+    :param k: how many positions
+    :param reverse: True to obtain the highest scores
+    :return: the 'k' positions (or all of them, if there are less)
+    """
+
+    keys = -scores if reverse else scores
+
+    if k <= 0:
+        top = np.empty(0, dtype=np.int64)
+    elif k >= len(keys):
+        top = np.argsort(keys, kind='stable')
+    else:
+        # the k-th key, and every position not worse than it
+        kth_key = np.partition(keys, k - 1)[k - 1]
+        candidates = np.flatnonzero(keys <= kth_key)
+        top = candidates[np.argsort(keys[candidates], kind='stable')][:k]
+
+    return top
+
+
 def check_data(data: list) -> bool:
     # sanity checks for data list
     #
@@ -193,15 +236,17 @@ def check_gpd_boundary(gpd_bound: gpd.GeoDataFrame):
 
 def _compute_file_name(prefix: str, suffix: str, sep: str, ext: str,
                        dt: datetime, num_zones: int, pop_card: int,
-                       iteration: int, is_solution: bool):
+                       iteration: int, is_solution: bool, island: int = None):
     # generate and return a valid file name
-    #
+    # (with the 'island' number, if any,
+    # and without iteration number if 'iteration' is None)
 
     if type(prefix) != str or type(suffix) != str or \
             type(sep) != str or len(sep) == 0 or \
             type(ext) != str or type(dt) != datetime or \
             type(num_zones) != int or type(pop_card) != int or \
-            type(iteration) != int or type(is_solution) != bool:
+            (iteration is not None and type(iteration) != int) or type(is_solution) != bool or \
+            (island is not None and type(island) != int):
         raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
 
     elements = list()
@@ -223,10 +268,20 @@ def _compute_file_name(prefix: str, suffix: str, sep: str, ext: str,
     elements.append(str(pop_card))
     elements.append(sep)
 
-    elements.append(our.FILE_IT_LIT)
-    elements.append(sep)
-    iteration_digits = len(str(our.GA_MAX_ITERATIONS))
-    elements.append(str(iteration).zfill(iteration_digits))
+    if island is not None:
+        elements.append(our.FILE_ISLAND_LIT)
+        elements.append(sep)
+        elements.append(str(island))
+        elements.append(sep)
+
+    if iteration is not None:
+        elements.append(our.FILE_IT_LIT)
+        elements.append(sep)
+        iteration_digits = len(str(our.GA_MAX_ITERATIONS))
+        elements.append(str(iteration).zfill(iteration_digits))
+    else:
+        # remove the last separator
+        elements.pop()
 
     if len(suffix) > 0:
         elements.append(sep)
@@ -253,6 +308,60 @@ def get_solution_dict(partition: Partition):
     return sol_dict
 
 
+#
+# offspring worker processes functions
+#
+
+# the designer of a worker process
+# (a copy of the one that forked it)
+_worker_designer = None
+
+
+def _init_offspring_worker(designer):
+    # initialize an offspring worker process
+    #
+
+    global _worker_designer
+
+    _worker_designer = designer
+
+    pass
+
+
+def _compose_evaluate_genotypes(genotypes: list) -> (list, tuple):
+    # decode and evaluate the 'genotypes' ((num_zones, 2) arrays of zone centers coordinates)
+    # at a worker process and return the result of each one:
+    # (assignment, center_distances, zone_values, zone_costs, zone_unconnected, score)
+    # and the lookups made at the worker caches, to be counted at the main process:
+    # (hits, misses) of the fitness, zone and distance (if any) caches
+
+    designer = _worker_designer
+
+    caches = [designer.fitness_cache, designer.zone_cache, designer.distance_cache]
+    stats_before = [cache.get_stats()[:2] if cache is not None else (0, 0) for cache in caches]
+
+    partitions = list()
+    for centers in genotypes:
+        part = designer._new_partition()
+        part.genotype = [Point(x, y) for x, y in centers.tolist()]
+        part.compose_partition()
+        partitions.append(part)
+
+    designer._evaluate(partitions=partitions)
+
+    results = [(part.assignment, part.center_distances,
+                part.zone_values, part.zone_costs, part.zone_unconnected, part.score)
+               for part in partitions]
+
+    designer._recycle_partitions(partitions=partitions)
+
+    stats_after = [cache.get_stats()[:2] if cache is not None else (0, 0) for cache in caches]
+    lookups = [(hits - hits_before, misses - misses_before)
+               for (hits, misses), (hits_before, misses_before) in zip(stats_after, stats_before)]
+
+    return results, lookups
+
+
 #
 # Class
 #
@@ -298,6 +407,8 @@ class PartitionDesigner:
     :param gpd_bound: a GeoDataFrame containing the map boundary
     :param gpd_dis: a GeoDataFrame containing the district geo-entities
     :param save_maps_to: path to folder where the maps will be saved
+    :param island: the island number, when the designer is one of
+        the islands of an island model GA (see fit and mt_IslandMigration.py)
 
     Example for geodata dict:
     ----------------------
@@ -324,7 +435,7 @@ class PartitionDesigner:
     def __init__(self, data: list, geodata: dict, valid_area: BaseGeometry,
                  num_zones: int, pop_card: int, logger: log.Logger,
                  gpd_bound: gpd.GeoDataFrame, gpd_dis: gpd.GeoDataFrame,
-                 save_maps_to: str):
+                 save_maps_to: str, island: int = None):
 
         # create object instance, if params syntax are correct
         all_correct = \
@@ -352,9 +463,59 @@ class PartitionDesigner:
             # path where to save resulting map/s
             self.save_maps_to = save_maps_to
 
+            # island number, if any
+            self.island = island
+
             num_districts = len(data)
             self.num_districts = num_districts
 
+            # the integer indexed representation of the districts
+            # shared by all the partitions
+            self.model = DistrictModel(data=data, geodata=geodata)
+
+            # with a discrete centers encoding, the zone centers candidates
+            # and its precomputed distances table
+            # (otherwise, the zone centers distances columns cache)
+            # shared by all the partitions, through the generations
+            if our.GA_CENTER_ENCODING == our.GA_CENTERS_CONTINUOUS:
+                self.candidates = None
+                self.distance_cache = DistanceCache(
+                    model=self.model, capacity=self.__calc_distance_cache_capacity())
+            else:
+                self.candidates = CenterCandidates(
+                    model=self.model, valid_area=valid_area, encoding=our.GA_CENTER_ENCODING)
+                if self.candidates.num_candidates < num_zones:
+                    raise ValueError(our.MG_ERROR_NUM_CANDIDATES.format(self.candidates.num_candidates))
+                self.distance_cache = None
+
+            # the already seen partitions evaluations cache
+            self.fitness_cache = FitnessCache(capacity=our.GA_FITNESS_CACHE_SIZE)
+
+            # the already seen zones aggregates cache
+            self.zone_cache = ZoneCache(capacity=our.GA_ZONE_CACHE_SIZE)
+
+            # calc cartesian boundaries (the smaller rectangle that contains the map)
+            # once for all the partitions
+            self.bounds = valid_area.bounds
+
+            # the discarded partitions, ready to be reused
+            self._partition_pool = list()
+
+            # the offspring worker processes (see fit)
+            self._offspring_workers = None
+
+            # the background map render process (see save_best_map)
+            self._map_renderer = None
+
+            # the whole map and zoom window raster renderers (see _save_raster_map)
+            self._raster_renderers = None
+
+            # the run trace (see fit)
+            self._run_trace = None
+
+            # the valid zone centers sampler
+            self.point_sampler = PointSampler(valid_area=valid_area, candidates=self.candidates)
+
             self.__calc_total_value()
 
             self.logger.info(
@@ -411,6 +572,20 @@ class PartitionDesigner:
 
         pass
 
+    def __calc_distance_cache_capacity(self) -> int:
+        # calculate how many distances columns can be cached:
+        # GA_DISTANCE_CACHE_FACTOR columns for each population gene
+        # but no more than GA_DISTANCE_CACHE_MAX_MB megabytes
+        # (and at least the columns of one partition)
+
+        wanted_columns = our.GA_DISTANCE_CACHE_FACTOR * self.pop_card * self.num_zones
+        column_bytes = np.dtype(float).itemsize * self.num_districts
+        affordable_columns = int(our.GA_DISTANCE_CACHE_MAX_MB * 2 ** 20 // column_bytes)
+
+        capacity = max(self.num_zones, min(wanted_columns, affordable_columns))
+
+        return capacity
+
     def __compute_cmap_palette(self):
         # compute palette
         #
@@ -426,29 +601,58 @@ class PartitionDesigner:
 
         pass
 
-    def fit(self):
+    def fit(self, migration: IslandMigration = None, resume_from: str = None):
         # apply the described GA
         # and find the best solution
         #
+        # with a 'migration', the designer is an island
+        # that exchanges its best genotypes with the other islands
+        # each GA_MIGRATION_INTERVAL iterations
+        #
+        # with a 'resume_from' checkpoint file, the run continues
+        # from the saved state (see _save_checkpoint)
 
-        # take a timestamp as file name part
-        tstamp = datetime.now()
+        if our.GA_STEADY_STATE and resume_from is not None:
+            raise ValueError(our.MG_ERROR_CHECKPOINT_STEADY_STATE)
+
+        try:
+            if our.GA_STEADY_STATE:
+                self._fit_steady_state(migration=migration)
+            else:
+                self._fit_generational(migration=migration, resume_from=resume_from)
+        finally:
+            # after an error or an interruption (^C)
+            # (after a normal end, they are already released, see _end_fit)
+            self._abort_fit()
+
+        pass
+
+    def _abort_fit(self):
+        # release the run resources still in use
+        #
+
+        # stop the offspring worker processes, without waiting for its tasks
+        self._stop_offspring_workers(terminate=True)
+
+        # close the run trace, so the records up to the failure are kept
+        self._stop_run_trace()
+
+        # stop the background render process, without waiting for the maps
+        self._stop_map_renderer(terminate=True)
+
+        pass
+
+    def _start_fit(self, tstamp: datetime):
+        # make, compose and evaluate the initial population
+        #
+
+        # fork the background render process, if any
+        self._start_map_renderer()
 
         # make an initial population
         # creating Partition class instances
         self._generate_initial_population()
 
-        # iteration counters
-        #
-        # global counter
-        it = 0
-        # no improvement counter
-        it_ni = 0
-        # log frequency about progress info
-        it_module = max(1, our.GA_INFO_ITERATIONS)
-        # last score reference value
-        reference_score: float
-
         # for each district,
         # find the closest zone center
         # and assign the district to the zone string
@@ -462,12 +666,198 @@ class PartitionDesigner:
 
         # update our score with the best one
         self._update_our_score()
-        reference_score = self.last_best_score
 
         # say hello
         self.logger.info(our.MG_INFO_INITIAL_SCORE.format(self.last_best_score))
         # and save current best solution map
-        self.save_best_map(tstamp=tstamp, iteration=it)
+        self.save_best_map(tstamp=tstamp, iteration=0)
+
+        # start the run trace, if any, with the initial best partition
+        self._start_run_trace(tstamp=tstamp)
+        self._trace_best_partition(iteration=0)
+
+        # fork the offspring worker processes, if any
+        self._start_offspring_workers()
+
+        pass
+
+    def _resume_fit(self, file_name: str) -> (datetime, int, int, float):
+        # restore the population and the run state
+        # from the 'file_name' checkpoint (see _save_checkpoint)
+        # and return the timestamp, the iteration counters and the reference score
+
+        state = load_checkpoint(file_name=file_name)
+
+        # it must be a checkpoint of a run like this one
+        if int(state['num_zones']) != self.num_zones or int(state['pop_card']) != self.pop_card or \
+                int(state['num_districts']) != self.num_districts or \
+                str(state['center_encoding']) != our.GA_CENTER_ENCODING:
+            raise ValueError(our.MG_ERROR_CHECKPOINT.format(file_name))
+
+        tstamp = datetime.strptime(str(state['tstamp']), our.FILE_DATESTAMP_FMT)
+
+        # fork the background render process, if any
+        self._start_map_renderer()
+
+        # the population, already composed and evaluated
+        self._restore_population(state=state)
+
+        # the random generators
+        random_gauss = float(state['random_gauss'])
+        random.setstate((int(state['random_version']),
+                         tuple(int(word) for word in state['random_state']),
+                         None if np.isnan(random_gauss) else random_gauss))
+        self.point_sampler.set_state(state={'rng_state': state['sampler_rng_state'],
+                                            'buffer': state['sampler_buffer']})
+
+        # continue the run trace, if any
+        trace_state = None
+        if 'trace_records' in state:
+            trace_state = {'records': state['trace_records'], 'n_bytes': state['trace_n_bytes'],
+                           'last_assignment': state['trace_last_assignment']}
+        self._start_run_trace(tstamp=tstamp, resume_state=trace_state)
+
+        self.logger.info(our.MG_INFO_RESUMING.format(file_name, int(state['iteration']), self.last_best_score))
+
+        # fork the offspring worker processes, if any
+        self._start_offspring_workers()
+
+        return tstamp, int(state['iteration']), int(state['iteration_ni']), state['reference_score'][()]
+
+    def _restore_population(self, state: dict):
+        # make the population partitions from the checkpoint 'state'
+        # (see _save_checkpoint): its genotypes are composed again,
+        # and its saved evaluations are restored
+
+        self.partition = list()
+
+        for centers, zone_values, zone_costs, zone_unconnected, score in \
+                zip(state['genotypes'], state['zone_values'], state['zone_costs'],
+                    state['zone_unconnected'], state['scores']):
+            part = self._new_partition()
+            part.genotype = [Point(x, y) for x, y in centers.tolist()]
+            part.compose_partition()
+            part.set_evaluation(zone_values=zone_values.copy(), zone_costs=zone_costs.copy(),
+                                zone_unconnected=zone_unconnected.copy(), score=score)
+            self.partition.append(part)
+
+        self.best_partition = self.partition[int(state['best_index'])]
+        self.last_best_score = state['last_best_score'][()]
+        self.best_score_history = list(state['best_score_history'])
+
+        pass
+
+    def _save_checkpoint(self, tstamp: datetime, iteration: int, iteration_ni: int, reference_score: float):
+        # save the run state to the checkpoint file of the run
+        # (replacing the previous one):
+        # the population genotypes and evaluations, the counters,
+        # the score history and the random generators states
+
+        checkpoint_file_name = _compute_file_name(
+            prefix=our.FILE_PREFIX, suffix=our.FILE_CHECKPOINT_SUFFIX, sep=our.FILE_NAME_SEP,
+            ext=our.FILE_CHECKPOINT_EXT, dt=tstamp,
+            num_zones=self.num_zones, pop_card=self.pop_card,
+            iteration=None, is_solution=False, island=self.island)
+
+        full_output_fname = os.path.normpath(self.save_maps_to + '/' + checkpoint_file_name)
+
+        # log file location
+        self.logger.info(our.MG_INFO_SAVING_CHECKPOINT.format(iteration, full_output_fname))
+
+        random_version, random_state, random_gauss = random.getstate()
+        sampler_state = self.point_sampler.get_state()
+
+        state = {
+            'tstamp': tstamp.strftime(our.FILE_DATESTAMP_FMT),
+            'num_zones': self.num_zones,
+            'pop_card': self.pop_card,
+            'num_districts': self.num_districts,
+            'center_encoding': our.GA_CENTER_ENCODING,
+            'island': self.island if self.island is not None else -1,
+            'iteration': iteration,
+            'iteration_ni': iteration_ni,
+            'reference_score': reference_score,
+            'last_best_score': self.last_best_score,
+            'best_score_history': np.array(self.best_score_history, dtype=float),
+            'genotypes': np.array([part.get_centers_array() for part in self.partition]),
+            'zone_values': np.array([part.zone_values for part in self.partition]),
+            'zone_costs': np.array([part.zone_costs for part in self.partition]),
+            'zone_unconnected': np.array([part.zone_unconnected for part in self.partition]),
+            'scores': np.array([part.score for part in self.partition], dtype=float),
+            'best_index': self.partition.index(self.best_partition),
+            'random_version': random_version,
+            'random_state': np.array(random_state, dtype=np.int64),
+            'random_gauss': random_gauss if random_gauss is not None else np.nan,
+            'sampler_rng_state': sampler_state['rng_state'],
+            'sampler_buffer': sampler_state['buffer']
+        }
+
+        if self._run_trace is not None:
+            trace_state = self._run_trace.get_state()
+            state['trace_records'] = trace_state['records']
+            state['trace_n_bytes'] = trace_state['n_bytes']
+            state['trace_last_assignment'] = trace_state['last_assignment']
+
+        save_checkpoint(file_name=full_output_fname, state=state)
+
+        pass
+
+    def _end_fit(self, tstamp: datetime, iteration: int):
+        # log and save the found solution
+        #
+
+        self._stop_offspring_workers()
+
+        # also log the found solution
+        self.logger.info(our.MG_INFO_SOLUTION_FOUND.format(iteration, self.last_best_score))
+        if self.distance_cache is not None:
+            self.logger.info(our.MG_INFO_DISTANCE_CACHE.format(*self.distance_cache.get_stats()))
+        self.logger.info(our.MG_INFO_FITNESS_CACHE.format(*self.fitness_cache.get_stats()))
+        self.logger.info(our.MG_INFO_ZONE_CACHE.format(*self.zone_cache.get_stats()))
+        # save final best solution map
+        self.save_best_map(tstamp=tstamp, iteration=iteration, is_solution=True)
+        # and the alphanumeric solution
+        self.save_best_solution_file(tstamp=tstamp, iteration=iteration)
+        # and close the run trace with it
+        self._trace_best_partition(iteration=iteration)
+        self._stop_run_trace()
+
+        # wait for the maps
+        self._stop_map_renderer()
+
+        pass
+
+    def _fit_generational(self, migration: IslandMigration = None, resume_from: str = None):
+        # apply the GA generation by generation:
+        # all the children of a generation are composed and evaluated
+        # before selecting the survivors
+        #
+        # each GA_CHECKPOINT_INTERVAL seconds, and at the end,
+        # the run state is saved to a checkpoint file
+
+        # log frequency about progress info
+        it_module = max(1, our.GA_INFO_ITERATIONS)
+
+        if resume_from is None:
+            # take a timestamp as file name part
+            tstamp = datetime.now()
+
+            # iteration counters
+            #
+            # global counter
+            it = 0
+            # no improvement counter
+            it_ni = 0
+
+            self._start_fit(tstamp=tstamp)
+
+            # last score reference value
+            reference_score = self.last_best_score
+        else:
+            tstamp, it, it_ni, reference_score = self._resume_fit(file_name=resume_from)
+
+        # wall clock time of the last checkpoint
+        checkpoint_time = time.monotonic()
 
         while it < our.GA_MAX_ITERATIONS and \
                 it_ni < our.GA_NONIMPROV_ITERATIONS:
@@ -485,16 +875,25 @@ class PartitionDesigner:
             # with GA_MUTATION_PROB probability
             self._apply_mutation_offspring(prob=our.GA_MUTATION_PROB)
 
-            # compose children zone strings
-            self._compose_offspring()
+            if self._use_offspring_workers():
+                # compose and evaluate the children
+                # at the worker processes
+                self._compose_evaluate_offspring_parallel()
+            else:
+                # compose children zone strings
+                self._compose_offspring()
 
-            # evaluate the fitness
-            # of the children
-            self._evaluate_offspring()
+                # evaluate the fitness
+                # of the children
+                self._evaluate_offspring()
 
             # select survivors
             self._select_next_generation(hold=our.GA_PARENTS_TO_HOLD)
 
+            # exchange the best genotypes with the other islands
+            if migration is not None and (it + 1) % our.GA_MIGRATION_INTERVAL == 0:
+                migration.exchange(designer=self)
+
             # which is the best partition?
             self._select_best_partition()
 
@@ -502,7 +901,8 @@ class PartitionDesigner:
             self._update_our_score()
 
             # if new score is better, then reset no improvement iterations counter
-            if self._is_new_score_better():
+            improved = self._is_new_score_better()
+            if improved:
                 it_ni = 0
             else:
                 it_ni += 1
@@ -510,20 +910,230 @@ class PartitionDesigner:
             # go to next iteration
             it += 1
 
+            # trace the new best partition
+            if improved:
+                self._trace_best_partition(iteration=it)
+
             # say something about our progress
             if it % it_module == 0 and reference_score != self.last_best_score or \
                     reference_score - self.last_best_score > our.GA_LOG_PC_SCORE_IMPROV * reference_score:
-                self.logger.info(our.MG_INFO_LAST_SCORE.format(it, self.last_best_score))
+                self.logger.info(our.MG_INFO_LAST_SCORE.format(
+                    it, self.last_best_score, self.fitness_cache.get_stats()[3]))
                 # save current best solution map if there are score variation
                 self.save_best_map(tstamp=tstamp, iteration=it)
                 reference_score = self.last_best_score
+            elif improved and self._maps_every_improvement():
+                # the raster maps are cheap, save one at every improvement
+                self.save_best_map(tstamp=tstamp, iteration=it)
 
-        # also log the found solution
-        self.logger.info(our.MG_INFO_SOLUTION_FOUND.format(it, self.last_best_score))
-        # save final best solution map
-        self.save_best_map(tstamp=tstamp, iteration=it, is_solution=True)
-        # and the alphanumeric solution
-        self.save_best_solution_file(tstamp=tstamp, iteration=it)
+            # save the run state periodically
+            if our.GA_CHECKPOINT_INTERVAL is not None and \
+                    time.monotonic() - checkpoint_time >= our.GA_CHECKPOINT_INTERVAL:
+                self._save_checkpoint(tstamp=tstamp, iteration=it, iteration_ni=it_ni,
+                                      reference_score=reference_score)
+                checkpoint_time = time.monotonic()
+
+        # and at the end, so the run can be continued with more iterations
+        if our.GA_CHECKPOINT_INTERVAL is not None:
+            self._save_checkpoint(tstamp=tstamp, iteration=it, iteration_ni=it_ni,
+                                  reference_score=reference_score)
+
+        self._end_fit(tstamp=tstamp, iteration=it)
+
+        pass
+
+    def _fit_steady_state(self, migration: IslandMigration = None):
+        # apply the GA without generations:
+        # each time a couple of children are evaluated
+        # they replace the worst partitions,
+        # so the worker processes (if any) never wait for a whole generation
+        #
+        # the stop criteria are counted in evaluations:
+        # pop_card evaluations are an iteration
+
+        # take a timestamp as file name part
+        tstamp = datetime.now()
+
+        # iteration counters, in evaluations
+        #
+        # global counter
+        n_evals = 0
+        # no improvement counter
+        n_evals_ni = 0
+        max_evals = our.GA_MAX_ITERATIONS * self.pop_card
+        max_evals_ni = our.GA_NONIMPROV_ITERATIONS * self.pop_card
+        # log frequency about progress info
+        it_module = max(1, our.GA_INFO_ITERATIONS)
+        # last score reference value
+        reference_score: float
+
+        self._start_fit(tstamp=tstamp)
+        reference_score = self.last_best_score
+
+        # the partitions scores
+        scores = np.array([part.get_score() for part in self.partition], dtype=float)
+
+        # the children being composed and evaluated at the worker processes
+        # {task number: children}, and its results as they arrive
+        in_flight = dict()
+        arrivals = queue.SimpleQueue()
+        n_tasks = 0
+        max_in_flight = our.GA_OFFSPRING_WORKERS * our.GA_STEADY_STATE_TASKS_PER_WORKER \
+            if self._offspring_workers is not None else 0
+
+        it = 0
+        while n_evals < max_evals and n_evals_ni < max_evals_ni:
+            if self._offspring_workers is not None:
+                # keep the workers busy
+                while len(in_flight) < max_in_flight:
+                    children = self._breed_children(scores=scores)
+                    in_flight[n_tasks] = children
+                    self._offspring_workers.apply_async(
+                        _compose_evaluate_genotypes,
+                        args=([part.get_centers_array() for part in children],),
+                        callback=lambda results, task=n_tasks: arrivals.put((task, results)),
+                        error_callback=lambda error, task=n_tasks: arrivals.put((task, error)))
+                    n_tasks += 1
+
+                # take the first children that arrive
+                task, results = arrivals.get()
+                if isinstance(results, BaseException):
+                    raise results
+                children = in_flight.pop(task)
+                self._take_worker_results(partitions=children, worker_results=results)
+            else:
+                children = self._breed_children(scores=scores)
+                for part in children:
+                    part.compose_partition()
+                self._evaluate(partitions=children)
+
+            # each child replaces the worst partition
+            for child in children:
+                best_score = self.best_partition.get_score()
+
+                worst = self._replace_worst_partition(scores=scores, child=child)
+                if worst is self.best_partition:
+                    self._select_best_partition()
+                elif get_best_value_index([best_score, child.get_score()]) == 1:
+                    self.best_partition = child
+
+                n_evals += 1
+
+                # if the child is better, then reset no improvement evaluations counter
+                if get_best_value_index([best_score, self.best_partition.get_score()]) == 1:
+                    n_evals_ni = 0
+                else:
+                    n_evals_ni += 1
+
+            # each pop_card evaluations are an iteration
+            while (it + 1) * self.pop_card <= n_evals:
+                it += 1
+
+                # update our score with the best one
+                self._update_our_score()
+                improved = self._is_new_score_better()
+
+                # exchange the best genotypes with the other islands
+                if migration is not None and it % our.GA_MIGRATION_INTERVAL == 0:
+                    migration.exchange(designer=self)
+                    scores = np.array([part.get_score() for part in self.partition], dtype=float)
+                    self._select_best_partition()
+
+                # trace the new best partition
+                if improved:
+                    self._trace_best_partition(iteration=it)
+
+                # say something about our progress
+                if it % it_module == 0 and reference_score != self.last_best_score or \
+                        reference_score - self.last_best_score > our.GA_LOG_PC_SCORE_IMPROV * reference_score:
+                    self.logger.info(our.MG_INFO_LAST_SCORE.format(
+                        it, self.last_best_score, self.fitness_cache.get_stats()[3]))
+                    # save current best solution map if there are score variation
+                    self.save_best_map(tstamp=tstamp, iteration=it)
+                    reference_score = self.last_best_score
+                elif improved and self._maps_every_improvement():
+                    # the raster maps are cheap, save one at every improvement
+                    self.save_best_map(tstamp=tstamp, iteration=it)
+
+        # the last score
+        if self.last_best_score != self.best_partition.get_score():
+            self._update_our_score()
+
+        self._end_fit(tstamp=tstamp, iteration=it)
+
+        pass
+
+    def _breed_children(self, scores: np.ndarray) -> list:
+        # select a couple by tournament and return its two children,
+        # crossed with GA_CROSSOVER_PROB probability (otherwise, copies of the parents)
+        # and mutated with GA_MUTATION_PROB probability
+        # 'scores' is the score of every partition
+
+        available = list(range(len(self.partition)))
+        daddy = self.__tournament_selection(n_adversaries=our.GA_TOURNAMENT_ADVERSARIES,
+                                            scores=scores, available=available)
+        mummy = self.__tournament_selection(n_adversaries=our.GA_TOURNAMENT_ADVERSARIES,
+                                            scores=scores, available=available)
+
+        dice = random.random()
+        if dice < our.GA_CROSSOVER_PROB:
+            children = self.__compute_crossover(dad=daddy, mum=mummy)
+        else:
+            children = list()
+            for parent in [daddy, mummy]:
+                child = self._new_partition()
+                child.genotype = list(parent.genotype)
+                if our.GA_INCREMENTAL_EVALUATION:
+                    child.inherit_state(parent=parent)
+                children.append(child)
+
+        for child in children:
+            child.mutate(prob=our.GA_MUTATION_PROB)
+
+        return children
+
+    def _replace_worst_partition(self, scores: np.ndarray, child: Partition) -> Partition:
+        # replace the worst partition by the 'child' one
+        # updating the 'scores' vector, and return the replaced partition
+
+        reverse_sorting = get_best_value_index([0, 1]) == 1
+
+        pos = get_top_indices(scores=scores, k=1, reverse=not reverse_sorting)[0]
+
+        worst = self.partition[pos]
+        self.partition[pos] = child
+        scores[pos] = child.get_score()
+
+        self._recycle_partitions(partitions=[worst])
+
+        return worst
+
+    def _new_partition(self) -> Partition:
+        # return a new (empty) partition
+        # reusing a discarded one, if any
+
+        if len(self._partition_pool) > 0:
+            new_part = self._partition_pool.pop()
+        else:
+            new_part = Partition(model=self.model, mean_value=self.mean_value,
+                                 valid_area=self.valid_area, num_zones=self.num_zones,
+                                 logger=self.logger, distance_cache=self.distance_cache,
+                                 zone_cache=self.zone_cache,
+                                 point_sampler=self.point_sampler,
+                                 candidates=self.candidates,
+                                 bounds=self.bounds)
+
+        return new_part
+
+    def _recycle_partitions(self, partitions: list):
+        # save the discarded 'partitions' to be reused
+        # (see _new_partition)
+
+        for part in partitions:
+            # the best one can still be plotted or saved
+            if part is not self.best_partition:
+                part.reset()
+                self._partition_pool.append(part)
 
         pass
 
@@ -536,9 +1146,7 @@ class PartitionDesigner:
         # will generate pop_card Partition objects
         for i in range(self.pop_card):
             # create a new one
-            new_part = Partition(data=self.data, mean_value=self.mean_value, geodata=self.geodata,
-                                 valid_area=self.valid_area, num_zones=self.num_zones,
-                                 logger=self.logger)
+            new_part = self._new_partition()
 
             # also populate it with random zone future centers
             new_part.generate_genotype()
@@ -568,12 +1176,96 @@ class PartitionDesigner:
 
         pass
 
+    def _start_offspring_workers(self):
+        # fork GA_OFFSPRING_WORKERS worker processes
+        # to compose and evaluate the children
+        # each one with a copy of this designer (the districts arrays and caches)
+
+        n_workers = our.GA_OFFSPRING_WORKERS
+
+        # a daemonic process (a sweep worker) can not have children
+        if n_workers is not None and n_workers > 1 and \
+                not mp.current_process().daemon and 'fork' in mp.get_all_start_methods():
+            context = mp.get_context('fork')
+            self._offspring_workers = context.Pool(processes=n_workers,
+                                                   initializer=_init_offspring_worker, initargs=(self,))
+            self.logger.info(our.MG_INFO_OFFSPRING_WORKERS.format(n_workers))
+
+        pass
+
+    def _stop_offspring_workers(self, terminate: bool = False):
+        # stop the offspring worker processes, if any
+        # (at once, discarding its pending tasks, if 'terminate')
+
+        if self._offspring_workers is not None:
+            if terminate:
+                self._offspring_workers.terminate()
+            else:
+                self._offspring_workers.close()
+            self._offspring_workers.join()
+            self._offspring_workers = None
+
+        pass
+
+    def _use_offspring_workers(self) -> bool:
+        # return True if the children must be composed and evaluated
+        # at the worker processes: there must be enough children
+        # to pay the inter process communication cost
+
+        return self._offspring_workers is not None and \
+            len(self.offspring) >= our.GA_OFFSPRING_WORKERS_MIN_CHILDREN
+
+    def _compose_evaluate_offspring_parallel(self):
+        # compose and evaluate the children at the worker processes
+        # only the genotypes are sent, and the decoded and evaluated
+        # state of each child comes back
+
+        genotypes = [part.get_centers_array() for part in self.offspring]
+
+        # a few chunks per worker, to balance the load
+        # without too many messages
+        n_chunks = min(len(genotypes), our.GA_OFFSPRING_WORKERS * our.GA_OFFSPRING_CHUNKS_PER_WORKER)
+        chunks = [genotypes[i::n_chunks] for i in range(n_chunks)]
+
+        chunk_results = self._offspring_workers.map(_compose_evaluate_genotypes, chunks, chunksize=1)
+
+        for i, worker_results in enumerate(chunk_results):
+            self._take_worker_results(partitions=self.offspring[i::n_chunks], worker_results=worker_results)
+
+        pass
+
+    def _take_worker_results(self, partitions: list, worker_results: tuple):
+        # set the decoded and evaluated state of the 'partitions'
+        # from the 'worker_results' (see _compose_evaluate_genotypes)
+        #
+        # the evaluations are remembered at our fitness cache,
+        # and the worker caches lookups are counted at ours,
+        # so the logged hit rates are the ones of the whole run
+
+        results, lookups = worker_results
+
+        for part, result in zip(partitions, results):
+            assignment, center_distances, zone_values, zone_costs, zone_unconnected, score = result
+            part.set_decoding(assignment=assignment, center_distances=center_distances)
+            part.set_evaluation(zone_values=zone_values, zone_costs=zone_costs,
+                                zone_unconnected=zone_unconnected, score=score)
+
+            key, zone_order = get_assignment_key(assignment=assignment, num_zones=self.num_zones)
+            self.fitness_cache.put(key=key, zone_order=zone_order, score=score,
+                                   zone_values=zone_values, zone_costs=zone_costs,
+                                   zone_unconnected=zone_unconnected)
+
+        for cache, (hits, misses) in zip([self.fitness_cache, self.zone_cache, self.distance_cache], lookups):
+            if cache is not None:
+                cache.add_lookups(hits=hits, misses=misses)
+
+        pass
+
     def _evaluate_parents(self):
         # calculate fitness function value
         # for each parent
 
-        for part in self.partition:
-            part.evaluate()
+        self._evaluate(partitions=self.partition)
 
         pass
 
@@ -581,8 +1273,81 @@ class PartitionDesigner:
         # calculate fitness function value
         # for each child
 
-        for part in self.offspring:
-            part.evaluate()
+        self._evaluate(partitions=self.offspring)
+
+        pass
+
+    def _evaluate(self, partitions: list):
+        # calculate fitness function value
+        # for each partition at 'partitions' list
+        # (unless its evaluation is already cached)
+
+        pending = list()
+
+        for part in partitions:
+            key, zone_order = get_assignment_key(assignment=part.assignment, num_zones=self.num_zones)
+            cached = self.fitness_cache.get(key=key, zone_order=zone_order)
+            if cached is not None:
+                _, zone_values, zone_costs, zone_unconnected = cached
+                # the cached score was summed in other zones order:
+                # sum it again in ours, as an evaluation would do
+                # (so the cache never changes a score, not even its last bit)
+                score = calc_partition_scores(zone_values=zone_values, zone_costs=zone_costs,
+                                              zone_unconnected=zone_unconnected,
+                                              mean=self.mean_value, num_zones=self.num_zones)
+                part.set_evaluation(zone_values=zone_values, zone_costs=zone_costs,
+                                    zone_unconnected=zone_unconnected, score=score)
+            else:
+                pending.append((part, key, zone_order))
+
+        pending_partitions = [part for part, _, _ in pending]
+
+        if our.GA_BATCH_EVALUATION:
+            # the partitions that have to be fully evaluated at once,
+            # and the rest (incrementally evaluated) one by one
+            full_partitions = [part for part in pending_partitions if part.needs_full_evaluation()]
+            incremental_partitions = [part for part in pending_partitions if not part.needs_full_evaluation()]
+            self._evaluate_batch(partitions=full_partitions)
+            for part in incremental_partitions:
+                part.evaluate()
+        else:
+            for part in pending_partitions:
+                part.evaluate()
+
+        # remember them
+        for part, key, zone_order in pending:
+            self.fitness_cache.put(key=key, zone_order=zone_order, score=part.score,
+                                   zone_values=part.zone_values, zone_costs=part.zone_costs,
+                                   zone_unconnected=part.zone_unconnected)
+
+        pass
+
+    def _evaluate_batch(self, partitions: list):
+        # calculate fitness function value
+        # for a list of (composed) partitions at once:
+        # their assignment vectors are stacked into a matrix
+        # and evaluated with a few vectorized passes
+        # (in chunks of at most GA_BATCH_MAX_ELEMENTS edges)
+
+        n_edges = max(1, len(self.model.indices))
+        chunk_size = max(1, our.GA_BATCH_MAX_ELEMENTS // n_edges)
+
+        for first in range(0, len(partitions), chunk_size):
+            chunk = partitions[first:first + chunk_size]
+
+            assignments = np.stack([part.assignment for part in chunk])
+
+            zone_values, zone_costs, zone_unconnected = \
+                self.model.zone_aggregates(assignments=assignments, num_zones=self.num_zones)
+
+            scores = calc_partition_scores(zone_values=zone_values, zone_costs=zone_costs,
+                                           zone_unconnected=zone_unconnected,
+                                           mean=self.mean_value, num_zones=self.num_zones)
+
+            # write back the results
+            for k, part in enumerate(chunk):
+                part.set_evaluation(zone_values=zone_values[k], zone_costs=zone_costs[k],
+                                    zone_unconnected=zone_unconnected[k], score=scores[k])
 
         pass
 
@@ -628,23 +1393,30 @@ class PartitionDesigner:
 
         return is_new_score_better
 
-    def __tournament_selection(self, n_adversaries: int):
+    def __tournament_selection(self, n_adversaries: int, scores: np.ndarray, available: list) -> Partition:
         # return the tournament winner
+        # among the 'available' partitions (its positions at the partition list)
+        # and remove it from them
         #
-
-        # construct the candidates list
-        candidates = list(set(self.partition) - set(self.daddy) - set(self.mummy))
+        # 'scores' is the score of every partition
 
         # select at most n_adversaries (with replacement)
-        adversaries = random.choices(candidates, k=n_adversaries)
+        adversaries = random.choices(range(len(available)), k=n_adversaries)
 
         best = None
 
-        for part in adversaries:
-            if best is None or get_best_value_index([best.get_score(), part.get_score()]) == 1:
-                best = part
+        for pos in adversaries:
+            if best is None or \
+                    get_best_value_index([scores[available[best]], scores[available[pos]]]) == 1:
+                best = pos
+
+        winner = available[best]
+
+        # it can not be selected again
+        available[best] = available[-1]
+        available.pop()
 
-        return best
+        return self.partition[winner]
 
     def _generate_parental_couples(self, n_adversaries: int):
         # generate parental couples
@@ -658,10 +1430,15 @@ class PartitionDesigner:
 
         n_couples = self.pop_card // 2
 
+        # the partitions scores
+        # and the ones that are not a daddy nor a mummy yet
+        scores = np.array([part.get_score() for part in self.partition])
+        available = list(range(len(self.partition)))
+
         for i in range(n_couples):
-            daddy = self.__tournament_selection(n_adversaries=n_adversaries)
+            daddy = self.__tournament_selection(n_adversaries=n_adversaries, scores=scores, available=available)
             self.daddy.append(daddy)
-            mummy = self.__tournament_selection(n_adversaries=n_adversaries)
+            mummy = self.__tournament_selection(n_adversaries=n_adversaries, scores=scores, available=available)
             self.mummy.append(mummy)
 
         pass
@@ -674,12 +1451,8 @@ class PartitionDesigner:
         num_zones = dad.num_zones
 
         # initially sons have no DNA (empty genotype)
-        son1 = Partition(data=self.data, mean_value=self.mean_value, geodata=self.geodata,
-                         valid_area=self.valid_area, num_zones=self.num_zones,
-                         logger=self.logger)
-        son2 = Partition(data=self.data, mean_value=self.mean_value, geodata=self.geodata,
-                         valid_area=self.valid_area, num_zones=self.num_zones,
-                         logger=self.logger)
+        son1 = self._new_partition()
+        son2 = self._new_partition()
 
         # how many zone genotypes will remain on dad?
         # at least 1 but no more than the total minus 1
@@ -691,6 +1464,11 @@ class PartitionDesigner:
         son1.genotype = son1_genotype
         son2.genotype = son2_genotype
 
+        # each son only has to decode the genes from the other parent
+        if our.GA_INCREMENTAL_EVALUATION:
+            son1.inherit_state(parent=dad)
+            son2.inherit_state(parent=mum)
+
         return son1, son2
 
     def _apply_crossover_operator(self, prob: float):
@@ -732,14 +1510,6 @@ class PartitionDesigner:
         # the more, the better ?
         reverse_sorting = get_best_value_index([0, 1]) == 1
 
-        # obtain an ordered partition list by partition score
-        parents_list = sorted(self.partition, key=lambda part: part.score,
-                              reverse=reverse_sorting)
-
-        # obtain an ordered children list by score
-        child_list = sorted(self.offspring, key=lambda part: part.score,
-                            reverse=reverse_sorting)
-
         # how many partitions must survive?
         n_population = self.pop_card
 
@@ -754,14 +1524,81 @@ class PartitionDesigner:
         # how many of them must be parents?
         n_parents = n_population - n_child
 
+        # obtain the top partitions and the top children by score
+        parents_scores = np.array([part.score for part in self.partition], dtype=float)
+        child_scores = np.array([part.score for part in self.offspring], dtype=float)
+        top_parents = get_top_indices(scores=parents_scores, k=n_parents, reverse=reverse_sorting)
+        top_children = get_top_indices(scores=child_scores, k=n_child, reverse=reverse_sorting)
+
+        # the rest can be reused
+        discarded_parents = np.ones(len(self.partition), dtype=bool)
+        discarded_parents[top_parents] = False
+        discarded_children = np.ones(len(self.offspring), dtype=bool)
+        discarded_children[top_children] = False
+        discarded = [self.partition[i] for i in np.flatnonzero(discarded_parents)] + \
+                    [self.offspring[i] for i in np.flatnonzero(discarded_children)]
+
         # and save the new list formed by each one top partitions
-        self.partition = parents_list[:n_parents] + child_list[:n_child]
+        self.partition = [self.partition[i] for i in top_parents] + \
+                         [self.offspring[i] for i in top_children]
+
+        self._recycle_partitions(partitions=discarded)
 
         # also delete the offspring
         self.offspring = list()
 
         pass
 
+    def get_best_genotypes(self, n: int) -> list:
+        # return the genotypes of the 'n' best partitions
+        # (the best first) as (num_zones, 2) arrays of zone centers coordinates
+
+        reverse_sorting = get_best_value_index([0, 1]) == 1
+
+        scores = np.array([part.get_score() for part in self.partition], dtype=float)
+        top = get_top_indices(scores=scores, k=n, reverse=reverse_sorting)
+
+        genotypes = [self.partition[i].get_centers_array() for i in top]
+
+        return genotypes
+
+    def receive_genotypes(self, genotypes: list):
+        # decode and evaluate the 'genotypes' received from other islands
+        # ((num_zones, 2) arrays of zone centers coordinates)
+        # each one replaces one of the worst partitions, if it's better
+
+        if len(genotypes) == 0:
+            return
+
+        immigrants = list()
+        for centers in genotypes:
+            part = self._new_partition()
+            part.genotype = [Point(x, y) for x, y in centers.tolist()]
+            part.compose_partition()
+            immigrants.append(part)
+
+        self._evaluate(partitions=immigrants)
+
+        reverse_sorting = get_best_value_index([0, 1]) == 1
+
+        # the best immigrants against the worst partitions
+        immigrant_scores = np.array([part.score for part in immigrants], dtype=float)
+        scores = np.array([part.score for part in self.partition], dtype=float)
+        best_immigrants = get_top_indices(scores=immigrant_scores, k=len(immigrants), reverse=reverse_sorting)
+        worst = get_top_indices(scores=scores, k=len(immigrants), reverse=not reverse_sorting)
+
+        discarded = list()
+        for i, j in zip(best_immigrants, worst):
+            if get_best_value_index([scores[j], immigrant_scores[i]]) == 1:
+                discarded.append(self.partition[j])
+                self.partition[j] = immigrants[i]
+            else:
+                discarded.append(immigrants[i])
+
+        self._recycle_partitions(partitions=discarded)
+
+        pass
+
     def _plot_partition_map(self, partition: Partition, window: list = None):
         # plot the 'partition' Partition
         # colored zone map
@@ -787,11 +1624,12 @@ class PartitionDesigner:
             partition.get_district_code_zone_id_lists()
 
         # rearrange the zone id list in same order than in GeoDataFrame
-        geo_dis_list = list(self.gpd_dis[our.GPD_DATA_CODE_FIELD])
+        # (the district codes list is in the model order, see DistrictModel.code_index)
+        code_index = self.model.code_index
         zone_id_list = list()
-        for dcode in geo_dis_list:
-            if dcode in district_code_list:
-                new_pos = district_code_list.index(dcode)
+        for dcode in self.gpd_dis[our.GPD_DATA_CODE_FIELD]:
+            new_pos = code_index.get(dcode)
+            if new_pos is not None:
                 zone_id_list.append(district_zone_id_list[new_pos])
             else:
                 # append -1 to avoid plotting superfluous included entities
@@ -936,22 +1774,182 @@ class PartitionDesigner:
     def save_best_map(self, tstamp: datetime, iteration: int, is_solution: bool = False):
         # plot the map image of the best partition
         # and then save it to disk
+        # (at the background render process, if any)
+
+        if not is_solution and not our.PLOT_PROGRESS_MAPS:
+            # only the solution map (see mt_trace_render.py to render the others)
+            pass
+        elif self._map_renderer is not None:
+            self._map_renderer.submit(snapshot=self._take_map_snapshot(
+                tstamp=tstamp, iteration=iteration, is_solution=is_solution))
+        else:
+            self._save_map(partition=self.best_partition, tstamp=tstamp,
+                           iteration=iteration, is_solution=is_solution)
 
-        self.plot_partition_map(partition=self.best_partition, iteration=iteration)
+        pass
+
+    def _save_map(self, partition: Partition, tstamp: datetime, iteration: int, is_solution: bool):
+        # plot the map image of the 'partition'
+        # and then save it to disk
+        # (the progress maps as raster images, if PLOT_RASTER_MAPS)
 
         map_file_name = _compute_file_name(
             prefix=our.FILE_PREFIX, suffix=our.FILE_MAP_SUFFIX, sep=our.FILE_NAME_SEP,
             ext=our.FILE_MAP_EXT, dt=tstamp,
             num_zones=self.num_zones, pop_card=self.pop_card,
-            iteration=iteration, is_solution=is_solution)
+            iteration=iteration, is_solution=is_solution, island=self.island)
 
         full_output_fname = os.path.normpath(self.save_maps_to + '/' + map_file_name)
 
         # log file location
         self.logger.info(our.MG_INFO_SAVING_MAP.format(iteration, full_output_fname))
 
-        plt.savefig(full_output_fname)
-        plt.close()
+        if our.PLOT_RASTER_MAPS and not is_solution:
+            self._save_raster_map(partition=partition, file_name=full_output_fname)
+        else:
+            self.plot_partition_map(partition=partition, iteration=iteration)
+            plt.savefig(full_output_fname)
+            plt.close()
+
+        pass
+
+    def _get_raster_renderers(self) -> list:
+        # return the whole map and zoom window raster renderers
+        # rasterizing the districts the first time
+
+        if self._raster_renderers is None:
+            self._raster_renderers = make_map_renderers(
+                gpd_dis=self.gpd_dis, gpd_bound=self.gpd_bound, codes=self.model.codes)
+
+        return self._raster_renderers
+
+    def _save_raster_map(self, partition: Partition, file_name: str):
+        # save the 'partition' whole map and zoom window
+        # side by side, as a raster image (see RasterRenderer)
+
+        image = render_map(renderers=self._get_raster_renderers(), assignment=partition.assignment,
+                           centers=partition.get_centers_array(), num_zones=self.num_zones)
+
+        save_png(file_name=file_name, image=image, image_colors=get_colors(palette=self.palette))
+
+        pass
+
+    def _maps_every_improvement(self) -> bool:
+        # return true if a progress map must be saved
+        # at every best score improvement
+
+        return our.PLOT_RASTER_MAPS and our.PLOT_RASTER_EVERY_IMPROVEMENT
+
+    def _take_map_snapshot(self, tstamp: datetime, iteration: int, is_solution: bool) -> dict:
+        # return what is needed to plot the best partition map
+        # (see _render_map_snapshot)
+
+        snapshot = {
+            'tstamp': tstamp,
+            'iteration': iteration,
+            'is_solution': is_solution,
+            'centers': self.best_partition.get_centers_array(),
+            'assignment': self.best_partition.assignment,
+            'center_distances': self.best_partition.center_distances,
+            'score_history': list(self.best_score_history)
+        }
+
+        return snapshot
+
+    def _render_map_snapshot(self, snapshot: dict):
+        # plot and save the map of a 'snapshot' (see _take_map_snapshot)
+        # at the render process
+
+        partition = self._new_partition()
+        partition.genotype = [Point(x, y) for x, y in snapshot['centers'].tolist()]
+        partition.set_decoding(assignment=snapshot['assignment'], center_distances=snapshot['center_distances'])
+
+        self.best_score_history = snapshot['score_history']
+
+        self._save_map(partition=partition, tstamp=snapshot['tstamp'],
+                       iteration=snapshot['iteration'], is_solution=snapshot['is_solution'])
+
+        self._recycle_partitions(partitions=[partition])
+
+        pass
+
+    def _start_map_renderer(self):
+        # fork the background render process
+        # (a daemonic process, a sweep worker, can not have children)
+
+        if our.GA_BACKGROUND_RENDER and \
+                not mp.current_process().daemon and 'fork' in mp.get_all_start_methods():
+            # rasterize the districts before forking, only once
+            if our.PLOT_RASTER_MAPS:
+                self._get_raster_renderers()
+            self._map_renderer = MapRenderer(render=self._render_map_snapshot, logger=self.logger)
+
+        pass
+
+    def _stop_map_renderer(self, terminate: bool = False):
+        # wait for the background render process to save all the maps
+        # (or stop it at once, if 'terminate')
+
+        if self._map_renderer is not None:
+            if terminate:
+                self._map_renderer.terminate()
+            else:
+                self._map_renderer.close()
+                self.logger.info(our.MG_INFO_MAP_RENDERER.format(*self._map_renderer.get_stats()))
+            self._map_renderer = None
+
+        pass
+
+    def _start_run_trace(self, tstamp: datetime, resume_state: dict = None):
+        # create the run trace file
+        # (or continue it from its 'resume_state', if the file is still there)
+        # (see RunTrace)
+
+        if our.GA_RUN_TRACE:
+            trace_file_name = _compute_file_name(
+                prefix=our.FILE_PREFIX, suffix=our.FILE_TRACE_SUFFIX, sep=our.FILE_NAME_SEP,
+                ext=our.FILE_TRACE_EXT, dt=tstamp,
+                num_zones=self.num_zones, pop_card=self.pop_card,
+                iteration=None, is_solution=False, island=self.island)
+
+            full_output_fname = os.path.normpath(self.save_maps_to + '/' + trace_file_name)
+
+            # log file location
+            self.logger.info(our.MG_INFO_SAVING_TRACE.format(full_output_fname))
+
+            if not os.path.exists(full_output_fname):
+                resume_state = None
+
+            info = {
+                'tstamp': tstamp.strftime(our.FILE_DATESTAMP_FMT),
+                'pop_card': self.pop_card,
+                'island': self.island
+            }
+            self._run_trace = RunTrace(file_name=full_output_fname, codes=self.model.codes,
+                                       num_zones=self.num_zones, palette=self.palette, info=info,
+                                       resume_state=resume_state)
+
+        pass
+
+    def _trace_best_partition(self, iteration: int):
+        # append the best partition to the run trace, if any
+        #
+
+        if self._run_trace is not None:
+            self._run_trace.append(iteration=iteration, score=self.best_partition.get_score(),
+                                   assignment=self.best_partition.assignment,
+                                   centers=self.best_partition.get_centers_array())
+
+        pass
+
+    def _stop_run_trace(self):
+        # close the run trace file
+        #
+
+        if self._run_trace is not None:
+            self._run_trace.close()
+            self.logger.info(our.MG_INFO_RUN_TRACE.format(*self._run_trace.get_stats()))
+            self._run_trace = None
 
         pass
 
@@ -963,7 +1961,7 @@ class PartitionDesigner:
             prefix=our.FILE_PREFIX, suffix=our.FILE_TXT_SUFFIX, sep=our.FILE_NAME_SEP,
             ext=our.FILE_TXT_EXT, dt=tstamp,
             num_zones=self.num_zones, pop_card=self.pop_card,
-            iteration=iteration, is_solution=True)
+            iteration=iteration, is_solution=True, island=self.island)
 
         full_output_fname = os.path.normpath(self.save_maps_to + '/' + txt_file_name)
 
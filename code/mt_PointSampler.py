@@ -0,0 +1,145 @@
+# Pràctica de creació de zones electorals per algorismes genètics
+#
+# IC - MUSI 21 22 - UIB
+#
+# Alumne: Lluís Bernat Ladaria
+
+"""
+PointSampler class - library
+"""
+
+#
+# system libraries
+#
+
+from shapely.geometry.base import BaseGeometry
+from shapely.geometry.point import Point
+import copy
+import random
+import json
+import numpy as np
+
+try:
+    # shapely >= 2.0
+    from shapely import contains_xy, prepare
+except ImportError:
+    # shapely 1.x
+    from shapely.vectorized import contains as contains_xy
+    prepare = None
+
+#
+# ours libraries
+#
+
+from mt_CenterCandidates import CenterCandidates
+import mt_common as our
+
+
+class PointSampler:
+    """
+    Class that encapsulates a sampler of random points
+    uniformly distributed into the study region
+
+    Candidate points are drawn in batches into the region bounding box,
+    tested all at once against the (prepared) region geometry,
+    and the valid ones are kept into a buffer,
+    that zone centers generation (initial population and mutation) consumes.
+    There is one sampler per PartitionDesigner.
+    The points are drawn with its own numpy generator,
+    seeded from the 'random' module one
+    (so a random.seed() call still makes a run repeatable)
+    With a discrete centers encoding, the points are drawn
+    from the center candidates set instead (see mt_CenterCandidates.py)
+
+    :param valid_area: the study region
+    :param batch_size: number of candidate points of each batch
+    :param candidates: the center candidates set, if any
+    """
+
+    def __init__(self, valid_area: BaseGeometry, batch_size: int = our.GA_SAMPLER_BATCH_SIZE,
+                 candidates: CenterCandidates = None):
+        # create the sampler instance
+        #
+
+        if type(batch_size) is not int or batch_size < 1:
+            raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+        self._batch_size = batch_size
+        self._candidates = candidates
+
+        # calc cartesian boundaries (the smaller rectangle that contains the map)
+        [self._x_min, self._y_min, self._x_max, self._y_max] = valid_area.bounds
+
+        # the containment tests are much faster against a prepared geometry
+        # (a copy, so the caller's geometry is left as it was)
+        if prepare is not None:
+            self._valid_area = copy.copy(valid_area)
+            prepare(self._valid_area)
+        else:
+            self._valid_area = valid_area
+
+        self._rng = np.random.default_rng(random.getrandbits(64))
+
+        # the valid points not consumed yet
+        # ((n, 2) array of coordinates, from the _next position on)
+        self._buffer = np.empty((0, 2), dtype=float)
+        self._next = 0
+
+        pass
+
+    def get_state(self) -> dict:
+        # return the sampler state (see set_state):
+        # its numpy generator state (a JSON string)
+        # and the valid points not consumed yet
+
+        state = {
+            'rng_state': json.dumps(self._rng.bit_generator.state),
+            'buffer': self._buffer[self._next:].copy()
+        }
+
+        return state
+
+    def set_state(self, state: dict):
+        # restore a sampler state (see get_state)
+        # so it draws the same points than the saved sampler
+
+        self._rng.bit_generator.state = json.loads(str(state['rng_state']))
+        self._buffer = np.array(state['buffer'], dtype=float).reshape(-1, 2)
+        self._next = 0
+
+        pass
+
+    def next_point(self) -> Point:
+        # return the next valid point
+        # (a point that is contained into the study region)
+
+        if self._next >= len(self._buffer):
+            self._fill_buffer()
+
+        x, y = self._buffer[self._next].tolist()
+        self._next += 1
+
+        return Point(x, y)
+
+    def _fill_buffer(self):
+        # draw batches of candidate points into the map cartesian bounds
+        # until some of them are into the study region
+        # (or a batch of center candidates)
+
+        if self._candidates is not None:
+            # any candidate is valid
+            ids = self._rng.integers(0, self._candidates.num_candidates, self._batch_size)
+            valid = self._candidates.coords[ids]
+        else:
+            valid = np.empty((0, 2), dtype=float)
+
+        while len(valid) == 0:
+            x = self._rng.uniform(self._x_min, self._x_max, self._batch_size)
+            y = self._rng.uniform(self._y_min, self._y_max, self._batch_size)
+            inside = contains_xy(self._valid_area, x, y)
+            valid = np.column_stack((x[inside], y[inside]))
+
+        self._buffer = valid
+        self._next = 0
+
+        pass
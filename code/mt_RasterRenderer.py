@@ -0,0 +1,333 @@
+# Pràctica de creació de zones electorals per algorismes genètics
+#
+# IC - MUSI 21 22 - UIB
+#
+# Alumne: Lluís Bernat Ladaria
+
+"""
+RasterRenderer class - library
+"""
+
+#
+# system libraries
+#
+
+import copy
+import geopandas as gpd
+import matplotlib.colors as colors
+import numpy as np
+# Pillow, a matplotlib dependency
+from PIL import Image
+
+try:
+    # shapely >= 2.0
+    from shapely import contains_xy, prepare
+except ImportError:
+    # shapely 1.x
+    from shapely.vectorized import contains as contains_xy
+    prepare = None
+
+#
+# ours libraries
+#
+
+import mt_common as our
+
+
+class RasterRenderer:
+    """
+    Class that encapsulates a fast partition map renderer
+
+    The districts are rasterized once into a label image:
+    each pixel holds the position of the district (at 'codes' list)
+    that contains its center, or -1.
+    The map boundary lines and the districts borders
+    are rasterized once too, as cached layers.
+    Then, each map (see render) is a lookup of the zone color
+    of every pixel by its district, composited with the cached layers
+    and the zone centers.
+    The images hold color indexes (see get_colors)
+    so they are saved as small indexed PNG files (see save_png)
+
+    :param gpd_dis: a GeoDataFrame containing the district geo-entities
+    :param gpd_bound: a GeoDataFrame containing the map boundary
+    :param codes: the districts codes, in the partitions assignment order
+    :param width: the image width, in pixels
+    :param extent: the [min_x, min_y, max_x, max_y] map window to render
+        (by default, the whole boundary and districts)
+    """
+
+    def __init__(self, gpd_dis: gpd.GeoDataFrame, gpd_bound: gpd.GeoDataFrame,
+                 codes: list, width: int = our.PLOT_RASTER_WIDTH, extent: list = None):
+        # create the renderer instance
+        # and rasterize the districts and the boundary
+
+        if type(width) is not int or width < 1:
+            raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+        if extent is None:
+            # the image covers the boundary and the districts
+            minx, miny, maxx, maxy = gpd_bound.total_bounds
+            dis_minx, dis_miny, dis_maxx, dis_maxy = gpd_dis.total_bounds
+            minx, miny = min(minx, dis_minx), min(miny, dis_miny)
+            maxx, maxy = max(maxx, dis_maxx), max(maxy, dis_maxy)
+        else:
+            minx, miny, maxx, maxy = extent
+
+        if not maxx > minx or not maxy > miny:
+            raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+        self._pixel_size = (maxx - minx) / width
+        self.width = width
+        self.height = max(1, int(np.ceil((maxy - miny) / self._pixel_size)))
+        self._minx = minx
+        self._maxy = maxy
+
+        # the districts label image
+        code_index = {code: i for i, code in enumerate(codes)}
+        self._labels = np.full((self.height, self.width), -1, dtype=np.int32)
+        for code, geometry in zip(gpd_dis[our.GPD_DATA_CODE_FIELD], gpd_dis[our.GPD_GEOMETRY_FIELD]):
+            district = code_index.get(code)
+            # ignore the districts not to be zoned
+            if district is not None and geometry is not None and not geometry.is_empty:
+                rows, cols, inside = self._rasterize(geometry)
+                self._labels[rows[inside], cols[inside]] = district
+
+        # the cached lines: the boundary and the districts borders
+        self._bound_lines = np.zeros((self.height, self.width), dtype=bool)
+        for geometry in gpd_bound[our.GPD_GEOMETRY_FIELD]:
+            if geometry is not None and not geometry.is_empty:
+                self._draw_lines(geometry)
+        self._district_borders = _find_borders(self._labels) & (self._labels >= 0)
+
+        # the labelled pixels
+        self._labelled = self._labels >= 0
+
+        pass
+
+    def _rasterize(self, geometry) -> (np.ndarray, np.ndarray, np.ndarray):
+        # return the rows and columns of the pixels into the 'geometry' bounding box
+        # and which of them have its center into the 'geometry'
+
+        gminx, gminy, gmaxx, gmaxy = geometry.bounds
+
+        col_from = max(0, int(np.floor((gminx - self._minx) / self._pixel_size)))
+        col_to = min(self.width, int(np.ceil((gmaxx - self._minx) / self._pixel_size)) + 1)
+        row_from = max(0, int(np.floor((self._maxy - gmaxy) / self._pixel_size)))
+        row_to = min(self.height, int(np.ceil((self._maxy - gminy) / self._pixel_size)) + 1)
+
+        # (none, if the 'geometry' is out of the image)
+        rows, cols = np.meshgrid(np.arange(row_from, row_to), np.arange(col_from, col_to), indexing='ij')
+        rows, cols = rows.ravel(), cols.ravel()
+
+        # the pixels centers
+        x = self._minx + (cols + 0.5) * self._pixel_size
+        y = self._maxy - (rows + 0.5) * self._pixel_size
+
+        # the containment tests are much faster against a prepared geometry
+        # (a copy, so the GeoDataFrame geometries are left as they were)
+        if prepare is not None:
+            geometry = copy.copy(geometry)
+            prepare(geometry)
+
+        inside = contains_xy(geometry, x, y)
+
+        return rows, cols, inside
+
+    def _draw_lines(self, geometry):
+        # mark the pixels crossed by the 'geometry' lines
+        # (the outlines, if it is a polygonal geometry) at the boundary lines mask
+
+        if geometry.geom_type in ['Polygon', 'MultiPolygon']:
+            geometry = geometry.boundary
+
+        for line in getattr(geometry, 'geoms', [geometry]):
+            coords = np.asarray(line.coords)[:, :2]
+            if len(coords) < 2:
+                continue
+
+            # sample each segment at half pixel steps
+            starts, ends = coords[:-1], coords[1:]
+            lengths = np.sqrt(((ends - starts) ** 2).sum(axis=1))
+            n_samples = np.ceil(lengths / (self._pixel_size / 2)).astype(np.int64) + 1
+            segment = np.repeat(np.arange(len(starts)), n_samples)
+            first = np.repeat(np.cumsum(n_samples) - n_samples, n_samples)
+            fraction = (np.arange(len(segment)) - first) / np.repeat(np.maximum(n_samples - 1, 1), n_samples)
+            points = starts[segment] + (ends[segment] - starts[segment]) * fraction[:, np.newaxis]
+
+            rows = np.floor((self._maxy - points[:, 1]) / self._pixel_size).astype(np.int64)
+            cols = np.floor((points[:, 0] - self._minx) / self._pixel_size).astype(np.int64)
+            visible = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+            self._bound_lines[rows[visible], cols[visible]] = True
+
+        pass
+
+    def render(self, assignment: np.ndarray, centers: np.ndarray, num_zones: int) -> np.ndarray:
+        """
+        Compose the image of a partition
+
+        :param assignment: the zone of each district
+        :param centers: (num_zones, 2) array of zone centers coordinates
+        :param num_zones: the number of zones
+        :return: the (height, width) color indexes image (see get_colors)
+        """
+
+        white, border, bound = get_color_indexes(num_zones=num_zones)
+
+        # the zone of each pixel (white, the last one, if it is unlabelled)
+        # is the index of its color
+        zone_colors = np.append(assignment, white).astype(np.int32)
+        image = zone_colors[self._labels]
+
+        # the zones borders are darker than the districts ones
+        zone_borders = _find_borders(image) & self._labelled
+        image[self._district_borders] += num_zones
+        image[zone_borders] = border
+        image[self._bound_lines] = bound
+
+        # the zone centers: a disc of its zone color with a border colored ring
+        radius = our.PLOT_RASTER_CENTER_RADIUS
+        offsets = np.arange(-radius, radius + 1)
+        d_rows, d_cols = np.meshgrid(offsets, offsets, indexing='ij')
+        distance = np.sqrt(d_rows * d_rows + d_cols * d_cols)
+        for zone, (x, y) in enumerate(centers.tolist()):
+            row = int((self._maxy - y) / self._pixel_size)
+            col = int((x - self._minx) / self._pixel_size)
+            for ring, color in [(distance <= radius, border),
+                                (distance <= radius - 1.5, zone)]:
+                rows = row + d_rows[ring]
+                cols = col + d_cols[ring]
+                visible = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+                image[rows[visible], cols[visible]] = color
+
+        return image
+
+
+def make_map_renderers(gpd_dis: gpd.GeoDataFrame, gpd_bound: gpd.GeoDataFrame, codes: list) -> list:
+    """
+    Return the whole map and the zoom window (PLOT_WINDOW_ZOOM) renderers
+    of the maps (see render_map), both with the same height
+
+    :param gpd_dis: a GeoDataFrame containing the district geo-entities
+    :param gpd_bound: a GeoDataFrame containing the map boundary
+    :param codes: the districts codes, in the partitions assignment order
+    :return: the two RasterRenderer
+    """
+
+    whole = RasterRenderer(gpd_dis=gpd_dis, gpd_bound=gpd_bound, codes=codes, width=our.PLOT_RASTER_WIDTH)
+
+    # the zoom window, as at PartitionDesigner._plot_partition_map
+    window = our.PLOT_WINDOW_ZOOM  # [wmin_x, wmin_y, wmax_x, wmax_y]
+    minx, miny, maxx, maxy = gpd_bound.total_bounds
+    deltax = maxx - minx
+    deltay = maxy - miny
+    extent = [minx + window[0] * deltax, miny + window[1] * deltay,
+              minx + window[2] * deltax, miny + window[3] * deltay]
+    zoom_width = max(1, round(whole.height * (extent[2] - extent[0]) / (extent[3] - extent[1])))
+    zoom = RasterRenderer(gpd_dis=gpd_dis, gpd_bound=gpd_bound, codes=codes, width=zoom_width, extent=extent)
+
+    return [whole, zoom]
+
+
+def render_map(renderers: list, assignment: np.ndarray, centers: np.ndarray, num_zones: int) -> np.ndarray:
+    """
+    Compose the image of a partition map:
+    the whole map and the zoom window side by side (see make_map_renderers)
+
+    :param renderers: the whole map and zoom window RasterRenderer
+    :param assignment: the zone of each district
+    :param centers: (num_zones, 2) array of zone centers coordinates
+    :param num_zones: the number of zones
+    :return: the color indexes image (see get_colors)
+    """
+
+    images = [renderer.render(assignment=assignment, centers=centers, num_zones=num_zones)
+              for renderer in renderers]
+
+    # same height, and a white gap between them
+    white = get_color_indexes(num_zones=num_zones)[0]
+    height = images[0].shape[0]
+    images[1] = images[1][:height]
+    if images[1].shape[0] < height:
+        images[1] = np.pad(images[1], ((0, height - images[1].shape[0]), (0, 0)),
+                           constant_values=white)
+    gap = np.full((height, our.PLOT_RASTER_CENTER_RADIUS * 2), white, dtype=images[0].dtype)
+
+    return np.hstack([images[0], gap, images[1]])
+
+
+def get_color_indexes(num_zones: int) -> (int, int, int):
+    # return the white, zones borders and boundary color indexes
+    # of the rendered images:
+    # after the zone colors, and the darker ones (the districts borders)
+
+    return 2 * num_zones, 2 * num_zones + 1, 2 * num_zones + 2
+
+
+def get_colors(palette: list) -> np.ndarray:
+    """
+    Return the colors of the rendered images (see RasterRenderer.render)
+
+    :param palette: the color of each zone
+    :return: the (2 * num_zones + 3, 3) 0-255 RGB values array
+    """
+
+    zone_colors = np.array([_to_rgb(color) for color in palette], dtype=np.uint8)
+    dark_colors = (zone_colors * 0.85).astype(np.uint8)
+    other_colors = np.array([[255, 255, 255],
+                             _to_rgb(our.PLOT_RASTER_ZONE_BORDER_COLOR),
+                             _to_rgb(our.PLOT_RASTER_BOUND_COLOR)], dtype=np.uint8)
+
+    return np.concatenate([zone_colors, dark_colors, other_colors])
+
+
+def to_pil_image(image: np.ndarray, image_colors: np.ndarray) -> Image.Image:
+    """
+    Return a color indexes image as a Pillow image
+    (an indexed one, if there are 256 colors at most)
+
+    :param image: the (height, width) color indexes image
+    :param image_colors: the (n_colors, 3) 0-255 RGB values of the color indexes
+    :return: the Pillow image
+    """
+
+    if len(image_colors) <= 256:
+        pil_image = Image.fromarray(image.astype(np.uint8))
+        pil_image.putpalette(image_colors.ravel().tolist())
+    else:
+        pil_image = Image.fromarray(image_colors[image])
+
+    return pil_image
+
+
+def save_png(file_name: str, image: np.ndarray, image_colors: np.ndarray):
+    """
+    Save a color indexes image as a PNG file (see to_pil_image)
+
+    :param file_name: the PNG file name
+    :param image: the (height, width) color indexes image
+    :param image_colors: the (n_colors, 3) 0-255 RGB values of the color indexes
+    """
+
+    pil_image = to_pil_image(image=image, image_colors=image_colors)
+    pil_image.save(file_name, compress_level=our.PLOT_RASTER_PNG_COMPRESS_LEVEL)
+
+    pass
+
+
+def _to_rgb(color) -> np.ndarray:
+    # return the 0-255 RGB values of a matplotlib 'color'
+    #
+
+    return np.round(np.array(colors.to_rgb(color)) * 255).astype(np.uint8)
+
+
+def _find_borders(image: np.ndarray) -> np.ndarray:
+    # return a mask of the pixels whose right or lower neighbour
+    # has a different value at the 'image'
+
+    borders = np.zeros(image.shape, dtype=bool)
+    borders[:, :-1] |= image[:, :-1] != image[:, 1:]
+    borders[:-1, :] |= image[:-1, :] != image[1:, :]
+
+    return borders
@@ -0,0 +1,199 @@
+# Pràctica de creació de zones electorals per algorismes genètics
+#
+# IC - MUSI 21 22 - UIB
+#
+# Alumne: Lluís Bernat Ladaria
+
+"""
+RunTrace class - library
+"""
+
+#
+# system libraries
+#
+
+import json
+import numpy as np
+
+#
+# ours libraries
+#
+
+import mt_common as our
+
+#
+# the trace file format (little endian)
+#
+# - file header:
+#   magic (8 bytes), header length (uint32), format version (uint32)
+#   header: a JSON dict (see RunTrace), padded with spaces to 8 bytes multiple
+# - then, a record for each best partition:
+#   record header (see TRACE_RECORD_DTYPE)
+#   centers: num_zones x 2 float64
+#   changed districts positions: n_changes int32
+#   and its new zones: n_changes int32
+#   padded with zeros to 8 bytes multiple
+#
+# so every array is 8 bytes aligned, and the file can be memory mapped
+# (see RunTraceReader)
+#
+
+TRACE_MAGIC = b'MT-TRACE'
+TRACE_FORMAT_VERSION = 1
+TRACE_FILE_HEADER_DTYPE = np.dtype([('magic', 'S8'), ('header_len', '<u4'), ('version', '<u4')])
+TRACE_RECORD_DTYPE = np.dtype([('iteration', '<i8'), ('score', '<f8'),
+                               ('n_changes', '<i4'), ('keyframe', '<i4')])
+
+
+def get_padding(n_bytes: int) -> int:
+    # return how many bytes are needed
+    # to align 'n_bytes' to 8 bytes
+
+    return -n_bytes % 8
+
+
+class RunTrace:
+    """
+    Class that encapsulates a run trace writer
+
+    The trace is an append only binary file,
+    with a record for each best partition found by the GA
+    (see PartitionDesigner.fit): the iteration, the score,
+    the zone centers and the districts assignment.
+    The assignment is delta encoded: only the districts that
+    have changed of zone since the previous record are saved,
+    except at the keyframes (the first record, and each
+    GA_TRACE_KEYFRAME_INTERVAL records) that save all of them.
+    The file header holds the districts codes and the zone colors,
+    so the maps of any record can be rendered
+    after the run (see mt_trace_render.py)
+
+    :param file_name: the trace file name
+    :param codes: the districts codes, in the partitions assignment order
+    :param num_zones: the number of zones
+    :param palette: the color of each zone
+    :param info: other run data to save at the header (a JSON serializable dict)
+    :param resume_state: the state of a trace to continue (see get_state),
+        instead of creating a new trace file
+    """
+
+    def __init__(self, file_name: str, codes: list, num_zones: int, palette: list, info: dict = None,
+                 resume_state: dict = None):
+        # create the trace instance
+        # and write the file header
+        # (or reopen the trace file, to continue it)
+
+        if type(num_zones) is not int or num_zones < 1 or len(palette) != num_zones:
+            raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+        self.file_name = file_name
+        self.num_districts = len(codes)
+        self.num_zones = num_zones
+
+        if resume_state is None:
+            header = {
+                'num_districts': self.num_districts,
+                'num_zones': num_zones,
+                'codes': [code if type(code) is str else int(code) for code in codes],
+                'palette': [[float(c) for c in color] for color in palette],
+                'info': info if info is not None else dict()
+            }
+            header_bytes = json.dumps(header).encode('utf-8')
+            header_bytes += b' ' * get_padding(TRACE_FILE_HEADER_DTYPE.itemsize + len(header_bytes))
+
+            file_header = np.zeros(1, dtype=TRACE_FILE_HEADER_DTYPE)
+            file_header['magic'] = TRACE_MAGIC
+            file_header['header_len'] = len(header_bytes)
+            file_header['version'] = TRACE_FORMAT_VERSION
+
+            self._file = open(file_name, 'wb')
+            self._file.write(file_header.tobytes())
+            self._file.write(header_bytes)
+            self._file.flush()
+
+            # the last saved assignment
+            self._last_assignment = None
+
+            # statistics
+            self.records = 0
+            self.n_bytes = self._file.tell()
+        else:
+            # forget the records appended after the state was taken
+            self._file = open(file_name, 'r+b')
+            self._file.truncate(int(resume_state['n_bytes']))
+            self._file.seek(0, 2)
+
+            self._last_assignment = np.array(resume_state['last_assignment'], dtype=np.int32) \
+                if int(resume_state['records']) > 0 else None
+
+            self.records = int(resume_state['records'])
+            self.n_bytes = int(resume_state['n_bytes'])
+
+        pass
+
+    def append(self, iteration: int, score: float, assignment: np.ndarray, centers: np.ndarray):
+        # append a record of a best partition:
+        # its 'iteration', 'score', districts 'assignment' and zone 'centers'
+        # (the file is flushed, so it can be read during the run)
+
+        if self._file is None or len(assignment) != self.num_districts or \
+                centers.shape != (self.num_zones, 2):
+            raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+        assignment = np.asarray(assignment, dtype=np.int32)
+
+        keyframe = self._last_assignment is None or self.records % our.GA_TRACE_KEYFRAME_INTERVAL == 0
+        if keyframe:
+            changes = np.arange(self.num_districts, dtype=np.int32)
+        else:
+            changes = np.flatnonzero(assignment != self._last_assignment).astype(np.int32)
+
+        record = np.zeros(1, dtype=TRACE_RECORD_DTYPE)
+        record['iteration'] = iteration
+        record['score'] = score
+        record['n_changes'] = len(changes)
+        record['keyframe'] = int(keyframe)
+
+        body = record.tobytes() + \
+            np.asarray(centers, dtype='<f8').tobytes() + \
+            changes.astype('<i4').tobytes() + \
+            assignment[changes].astype('<i4').tobytes()
+        body += b'\x00' * get_padding(len(body))
+
+        self._file.write(body)
+        self._file.flush()
+
+        self._last_assignment = assignment.copy()
+        self.records += 1
+        self.n_bytes += len(body)
+
+        pass
+
+    def get_state(self) -> dict:
+        # return the trace state, to continue it later
+        # (see the 'resume_state' param)
+
+        state = {
+            'records': self.records,
+            'n_bytes': self.n_bytes,
+            'last_assignment': self._last_assignment if self._last_assignment is not None
+            else np.zeros(self.num_districts, dtype=np.int32)
+        }
+
+        return state
+
+    def close(self):
+        # close the trace file
+        #
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        pass
+
+    def get_stats(self) -> (int, int):
+        # return the trace statistics:
+        # saved records and file size (bytes)
+
+        return self.records, self.n_bytes
@@ -0,0 +1,170 @@
+# Pràctica de creació de zones electorals per algorismes genètics
+#
+# IC - MUSI 21 22 - UIB
+#
+# Alumne: Lluís Bernat Ladaria
+
+"""
+RunTraceReader class - library
+"""
+
+#
+# system libraries
+#
+
+import json
+import numpy as np
+
+#
+# ours libraries
+#
+
+from mt_RunTrace import TRACE_MAGIC, TRACE_FORMAT_VERSION, TRACE_FILE_HEADER_DTYPE, \
+    TRACE_RECORD_DTYPE, get_padding
+import mt_common as our
+
+
+class RunTraceReader:
+    """
+    Class that encapsulates a run trace reader (see RunTrace)
+
+    The trace file is memory mapped, and its records are indexed
+    (only its fixed size headers are read) when the reader is created.
+    The assignment of a record is rebuilt from the previous keyframe,
+    applying the changes of the records between them.
+    A trace being written can be read too: its last records
+    will be indexed by a new reader
+
+    :param file_name: the trace file name
+    """
+
+    def __init__(self, file_name: str):
+        # create the reader instance
+        # map the file and index its records
+
+        self.file_name = file_name
+        self._data = np.memmap(file_name, dtype=np.uint8, mode='r')
+
+        file_header = self._data[:TRACE_FILE_HEADER_DTYPE.itemsize].view(TRACE_FILE_HEADER_DTYPE)[0]
+        if file_header['magic'] != TRACE_MAGIC or file_header['version'] != TRACE_FORMAT_VERSION:
+            raise ValueError(our.MG_ERROR_TRACE_FILE.format(file_name))
+
+        header_start = TRACE_FILE_HEADER_DTYPE.itemsize
+        header_end = header_start + int(file_header['header_len'])
+        header = json.loads(self._data[header_start:header_end].tobytes().decode('utf-8'))
+
+        self.num_districts = header['num_districts']
+        self.num_zones = header['num_zones']
+        self.codes = header['codes']
+        self.palette = [tuple(color) for color in header['palette']]
+        self.info = header['info']
+
+        # index the records
+        offsets = list()
+        offset = header_end
+        centers_size = self.num_zones * 2 * 8
+        while offset + TRACE_RECORD_DTYPE.itemsize <= len(self._data):
+            record = self._data[offset:offset + TRACE_RECORD_DTYPE.itemsize].view(TRACE_RECORD_DTYPE)[0]
+            size = TRACE_RECORD_DTYPE.itemsize + centers_size + int(record['n_changes']) * 2 * 4
+            size += get_padding(size)
+            # ignore an incomplete last record (a trace being written)
+            if offset + size > len(self._data):
+                break
+            offsets.append(offset)
+            offset += size
+
+        self._offsets = np.array(offsets, dtype=np.int64)
+        self.num_records = len(offsets)
+
+        records = [self._get_record_header(k) for k in range(self.num_records)]
+        self.iterations = np.array([record['iteration'] for record in records], dtype=np.int64)
+        self.scores = np.array([record['score'] for record in records], dtype=float)
+        self._keyframes = np.flatnonzero([record['keyframe'] for record in records])
+
+        pass
+
+    def _get_record_header(self, k: int) -> np.void:
+        # return the header of the 'k' record
+        #
+
+        offset = self._offsets[k]
+
+        return self._data[offset:offset + TRACE_RECORD_DTYPE.itemsize].view(TRACE_RECORD_DTYPE)[0]
+
+    def _get_record_arrays(self, k: int) -> (np.ndarray, np.ndarray, np.ndarray):
+        # return the centers, the changed districts and its new zones
+        # of the 'k' record (views of the mapped file)
+
+        n_changes = int(self._get_record_header(k)['n_changes'])
+
+        start = self._offsets[k] + TRACE_RECORD_DTYPE.itemsize
+        centers = self._data[start:start + self.num_zones * 2 * 8].view('<f8').reshape(self.num_zones, 2)
+
+        start += self.num_zones * 2 * 8
+        districts = self._data[start:start + n_changes * 4].view('<i4')
+
+        start += n_changes * 4
+        zones = self._data[start:start + n_changes * 4].view('<i4')
+
+        return centers, districts, zones
+
+    def find_record(self, iteration: int) -> int:
+        """
+        Return the record of the best partition at an iteration
+
+        :param iteration: the iteration
+        :return: the number of the last record at or before 'iteration'
+        """
+
+        k = int(np.searchsorted(self.iterations, iteration, side='right')) - 1
+        if k < 0:
+            raise ValueError(our.MG_ERROR_TRACE_ITERATION.format(iteration))
+
+        return k
+
+    def get_assignment(self, k: int) -> np.ndarray:
+        """
+        Return the districts assignment of a record
+
+        :param k: the record number
+        :return: the zone of each district
+        """
+
+        if not 0 <= k < self.num_records:
+            raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+        # from the previous keyframe
+        first = self._keyframes[np.searchsorted(self._keyframes, k, side='right') - 1]
+
+        assignment = np.empty(self.num_districts, dtype=np.int32)
+        for j in range(first, k + 1):
+            centers, districts, zones = self._get_record_arrays(j)
+            assignment[districts] = zones
+
+        return assignment
+
+    def get_centers(self, k: int) -> np.ndarray:
+        """
+        Return the zone centers of a record
+
+        :param k: the record number
+        :return: (num_zones, 2) array of zone centers coordinates
+        """
+
+        if not 0 <= k < self.num_records:
+            raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+        return np.array(self._get_record_arrays(k)[0])
+
+    def get_score_history(self) -> np.ndarray:
+        """
+        Return the best score of each iteration,
+        from the first to the last recorded one
+
+        :return: the scores array
+        """
+
+        iterations = np.arange(self.iterations[-1] + 1) if self.num_records > 0 else np.array([], dtype=np.int64)
+        records = np.searchsorted(self.iterations, iterations, side='right') - 1
+
+        return self.scores[records]
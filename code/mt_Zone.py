@@ -14,35 +14,33 @@ Zone class - library
 
 from shapely.geometry.point import Point
 import logging as log
+import numpy as np
 
 #
 # ours libraries
 #
 
+from mt_DistrictModel import DistrictModel
 import mt_common as our
 
 
-def _intersection(list1: list, list2: list) -> list:
-    # return a list with the common list1 and list2 elements
-    #
-
-    temp = set(list2)
-    new_list = [value for value in list1 if value in temp]
-
-    return new_list
-
-
 class Zone:
     """
     Class that encapsulates a zone
 
     A zone contains a list of (probably connected) districts
-    and all the methods to deal with
+    and all the methods to deal with.
+    The districts are identified by its position
+    at the DistrictModel (see mt_DistrictModel.py)
     """
 
-    def __init__(self, center: Point, logger: log.Logger):
+    __slots__ = ('_center', '_logger', '_model', '_zone_id', '_districts', '_distances',
+                 '_n_districts', '_zone_value', '_conn_cost', '_unconnected_parts')
+
+    def __init__(self, center: Point, logger: log.Logger, model: DistrictModel, zone_id: int):
         # create a zone instance
         # centered at 'center' Point
+        # 'zone_id' is the zone position at its partition
 
         # check center contains a Point
         if type(center) is not Point:
@@ -51,10 +49,14 @@ class Zone:
         # save parameters
         self._center = center
         self._logger = logger
+        self._model = model
+        self._zone_id = zone_id
 
-        # zone is composed by district entries
-        # we save them into this dictionary
-        self._districts = dict()
+        # zone is composed by districts
+        # we save its positions into this array
+        self._districts = np.empty(0, dtype=np.int64)
+        # and its distances to the zone center
+        self._distances = np.empty(0, dtype=float)
 
         # and this is the district's counter
         self._n_districts = 0
@@ -111,88 +113,45 @@ class Zone:
 
         return unconnected
 
+    def get_districts(self) -> np.ndarray:
+        # return the positions of the districts at this zone
+        #
+
+        districts = self._districts
+
+        return districts
+
     def get_districts_codes(self) -> list:
         # return a list of the codes of the districts at this zone
         #
 
-        districts = self._districts.keys()
+        codes = self._model.codes
+        districts = [codes[i] for i in self._districts]
 
-        return list(districts)
+        return districts
 
-    def add_district(self, dis_code: str, dis_value: int,
-                     center_distance: float, dis_geodata: dict):
+    def add_districts(self, districts: np.ndarray, center_distances: np.ndarray):
         """
-        Add district entry to zone string and its associated value,
-        distance to zone center and neighbours data
+        Add districts to zone and its distances to zone center
 
-        :param dis_code: code of the district
-        :param dis_value: the value of the district (its population)
-        :param center_distance: distance from district centroid to zone center
-        :param dis_geodata: dictionary with list of neighbour codes and list of connection cost to each neighbour
+        :param districts: positions of the districts (see DistrictModel)
+        :param center_distances: distances from districts centroids to zone center
         """
 
-        entry = {
-            1: dis_value,  # the value of the district (its population)
-            2: center_distance,  # distance from district centroid to zone center
-            3: dis_geodata  # dictionary with list of neighbour codes and list of connection cost to each neighbour
-        }
-
-        self._districts[dis_code] = entry
-        self._zone_value += dis_value
-        self._n_districts += 1
+        self._districts = np.concatenate([self._districts, districts])
+        self._distances = np.concatenate([self._distances, center_distances])
+        self._zone_value += self._model.values[districts].sum()
+        self._n_districts += len(districts)
 
         pass
 
-    def calc_cost(self):
-        # calculate the mean connectivity cost value
-        # as the average of the connectivity cost
-        # of each pair of districts that composed the zone
-        #
-        # also detects the number of isolated parts
-        # and updates its attribute accordingly
-
-        # construct our districts list of codes
-        district_code_list = list(self._districts.keys())
+    def set_cost(self, conn_cost: float, unconnected: int):
+        # set the mean connectivity cost and the number of
+        # unconnected parts, computed for all the zones of a partition
+        # (see DistrictModel.zone_aggregates)
 
-        total_cost = 0.
-        total_connections = 0
-
-        # if there are more than one district at the zone
-        # then calculate the connectivity (mean) cost
-        if len(district_code_list) > 1:
-            for d1_code in self._districts.keys():
-                d1_cost = 0.
-                d1_connections = 0
-
-                d1_geodata = self._districts.get(d1_code)[3]  # 3: geodata dictionary entry
-                d1_neighbours_list = d1_geodata[our.DICT_DISTRICT_NEIGHBOURS_CODE_LIST]
-                d1_cost_list = d1_geodata[our.DICT_DISTRICT_NEIGHBOURS_COST_LIST]
-
-                # compute the list with the common districts codes
-                my_zone_neighbours_list = _intersection(district_code_list, d1_neighbours_list)
-
-                for code in my_zone_neighbours_list:
-                    i = d1_neighbours_list.index(code)
-                    d1_cost += d1_cost_list[i]
-                    d1_connections += 1
-
-                total_cost += d1_cost
-                total_connections += d1_connections
-
-            self._compute_unconnected_parts()
-        else:
-            self._unconnected_parts = 0  # in 1-district zones there are not unconnected parts
-
-        if total_connections > 0:
-            # calculate the average cost
-            # the lower, the better
-            mean_cost = total_cost / total_connections
-        else:
-            # assign a mean_cost value to 1-district zones
-            # or zones with all its districts unconnected
-            mean_cost = our.GA_1_DISTRICT_ZONE_MEAN_COST
-
-        self._conn_cost = mean_cost
+        self._conn_cost = conn_cost
+        self._unconnected_parts = unconnected
 
         pass
 
@@ -201,66 +160,28 @@ class Zone:
         # log a zone dump
 
         self._logger.debug("Center:            {}".format(self._center))
-        self._logger.debug("Districts list:    {}".format(self._districts))
+        self._logger.debug("Districts list:    {}".format(self.get_districts_codes()))
         self._logger.debug("Total zone value:  {}".format(self._zone_value))
         self._logger.debug("Connectivity cost: {}".format(self._conn_cost))
 
         pass
 
-    def __visit_neighbour(self, districts: list, pos: int):
-
-        # mark this district as visited
-        self.visited_status[pos] = True
-
-        # locate its neighbours
-        dis_entry = self._districts.get(districts[pos])
-        neighbours = dis_entry.get(3).get(our.DICT_DISTRICT_NEIGHBOURS_CODE_LIST)
-
-        neighbours_into_zone = _intersection(neighbours, districts)
-
-        for neig in neighbours_into_zone:
-            neig_pos = districts.index(neig)
-            if not self.visited_status[neig_pos]:
-                self.__visit_neighbour(districts=districts, pos=neig_pos)
-
-        pass
-
-    def _compute_unconnected_parts(self):
-        # compute number of unconnected parts the zone has
-        #
-
-        # counter at zero
-        unconnected = 0
-
-        # get list of own district codes
-        districts = self.get_districts_codes()
-
-        # create a vector of visited districts status (boolean)
-        self.visited_status = [False] * len(districts)
-
-        # start tour at first district
-        init_pos = 0
-
-        # start tour at first district
-        self.__visit_neighbour(districts=districts, pos=init_pos)
-
-        while False in self.visited_status:
-            # if there are non visited districts, then
-            # increment unconnected counter and make new tour
-            # from unvisited district
-            unconnected += 1
-
-            init_pos = self.visited_status.index(False)
-
-            # start new tour
-            self.__visit_neighbour(districts=districts, pos=init_pos)
-
-        self._unconnected_parts = unconnected
-
-        pass
-
     def get_serialized_zone(self) -> dict:
-
-        serialized_zone = self._districts
+        # return a dictionary with an entry for each district
+        # {code: {1: value, 2: distance to zone center, 3: geodata}}
+
+        codes = self._model.codes
+        data = self._model.data
+        geodata = self._model.geodata
+
+        serialized_zone = dict()
+
+        for district, center_distance in zip(self._districts, self._distances):
+            code = codes[district]
+            serialized_zone[code] = {
+                1: data[district][our.LIST_DATA_VALUE_COL],  # the value of the district (its population)
+                2: float(center_distance),  # distance from district centroid to zone center
+                3: geodata[code]  # dictionary with list of neighbour codes and list of connection cost to each neighbour
+            }
 
         return serialized_zone
@@ -0,0 +1,96 @@
+# Pràctica de creació de zones electorals per algorismes genètics
+#
+# IC - MUSI 21 22 - UIB
+#
+# Alumne: Lluís Bernat Ladaria
+
+"""
+ZoneCache class - library
+"""
+
+#
+# system libraries
+#
+
+import hashlib
+import numpy as np
+
+#
+# ours libraries
+#
+
+from mt_LRUCache import LRUCache
+
+
+def get_members_key(districts: np.ndarray) -> bytes:
+    """
+    Compute the key of a zone from its districts set:
+    a hash of its (sorted) districts positions
+
+    :param districts: the positions of the districts of the zone
+    :return: the key
+    """
+
+    members = np.sort(districts).astype(np.int64, copy=False)
+
+    key = hashlib.blake2b(members.tobytes(), digest_size=16).digest()
+
+    return key
+
+
+class ZoneCache:
+    """
+    Class that encapsulates a cache of zone aggregates
+
+    Children inherit most zone centers from their parents,
+    so many zones come out with exactly the same districts
+    from one generation to the next.
+    This cache maps the key of a zone districts set (see get_members_key)
+    to its aggregates: value, mean connectivity cost
+    and unconnected parts (see DistrictModel.zone_aggregates),
+    so a repeated zone is not evaluated again.
+    The least recently used entries are evicted when
+    'capacity' entries are reached
+
+    :param capacity: max number of cached zones
+    """
+
+    def __init__(self, capacity: int):
+        # create the cache instance
+        #
+
+        # {key: (value, conn_cost, unconnected)}
+        self._entries = LRUCache(capacity=capacity)
+
+        pass
+
+    def get(self, key: bytes):
+        # return the cached aggregates of the 'key' zone:
+        # (value, conn_cost, unconnected)
+        # or None if not cached
+
+        entry = self._entries.get(key)
+
+        return entry
+
+    def put(self, key: bytes, value, conn_cost: float, unconnected: int):
+        # save the aggregates of the 'key' zone
+        #
+
+        self._entries.put(key, (value, conn_cost, unconnected))
+
+        pass
+
+    def add_lookups(self, hits: int, misses: int):
+        # count the lookups made at a worker process copy of this cache
+        # (see PartitionDesigner._take_worker_results)
+
+        self._entries.add_lookups(hits=hits, misses=misses)
+
+        pass
+
+    def get_stats(self) -> (int, int, int, float):
+        # return the cache statistics:
+        # hits, misses, evictions and hit rate
+
+        return self._entries.get_stats()
@@ -31,10 +31,73 @@ GA_UNCONNECTED_ZONE_WEIGHT = 10.  # weight for of unconnected zones count score
 # we assign to them a feasible value:
 GA_1_DISTRICT_ZONE_MEAN_COST = 0.80  # mean connectivity cost assigned to 1-district zones
 
+# evaluate the fitness of a whole generation at once (vectorized)
+GA_BATCH_EVALUATION = True
+GA_BATCH_MAX_ELEMENTS = 2 ** 24  # max partitions x neighbourhood edges evaluated at once
+# children only decode and evaluate what changed from a parent
+GA_INCREMENTAL_EVALUATION = True
+
+# zone centers distances columns cache
+GA_DISTANCE_CACHE_FACTOR = 4  # cached columns for each population gene (pop_card * num_zones)
+GA_DISTANCE_CACHE_MAX_MB = 256  # but no more than this megabytes
+
+# already seen partitions evaluations cache
+GA_FITNESS_CACHE_SIZE = 100000  # max cached evaluations
+
+# already seen zones aggregates cache
+GA_ZONE_CACHE_SIZE = 200000  # max cached zones
+
+# search the nearest zone centers with a KD-tree (if scipy is installed)
+GA_KDTREE_MIN_ZONES = 128  # from this number of zones on (see mt_decoding_benchmark.py)
+GA_KDTREE_NEIGHBOURS = 8  # nearest centers measured again to break ties as the brute force search
+
+# zone centers encoding
+GA_CENTERS_CONTINUOUS = 'continuous'  # any point into the study region
+GA_CENTERS_CENTROIDS = 'centroids'  # one of the districts centroids
+GA_CENTERS_LATTICE = 'lattice'  # one of the points of a lattice into the study region
+GA_CENTER_ENCODING = GA_CENTERS_CONTINUOUS  # default encoding
+GA_CENTERS_LATTICE_SIZE = 2000  # approximated number of lattice points
+GA_CENTERS_MAX_TABLE_SIZE = 25000000  # max districts x candidates distances (8 bytes each)
+
+# valid zone centers sampler
+GA_SAMPLER_BATCH_SIZE = 1024  # candidate points tested at once
+
+# compose and evaluate the children at worker processes
+GA_OFFSPRING_WORKERS = None  # number of worker processes (None or 1: at the main process)
+GA_OFFSPRING_CHUNKS_PER_WORKER = 2  # children chunks sent to each worker at each generation
+GA_OFFSPRING_WORKERS_MIN_CHILDREN = 32  # fewer children are composed and evaluated at the main process
+
+# steady state GA: no generations, each couple of children
+# replace the worst partitions as soon as they are evaluated
+GA_STEADY_STATE = False
+GA_STEADY_STATE_TASKS_PER_WORKER = 2  # couples being composed and evaluated at each worker process
+
+# plot and save the maps at a background process
+GA_BACKGROUND_RENDER = True
+GA_RENDER_QUEUE_SIZE = 2  # max maps waiting to be rendered
+
+# save a binary trace of the best partitions of the run
+# to render its maps afterwards (see mt_trace_render.py)
+GA_RUN_TRACE = False
+GA_TRACE_KEYFRAME_INTERVAL = 50  # save the whole assignment each n records (the others, only the changes)
+
+# save checkpoints of the run state, to resume it (see PartitionDesigner.fit)
+# (only the generational GA, not the steady state one)
+GA_CHECKPOINT_INTERVAL = None  # wall clock seconds between checkpoints, e.g. 600 (None: no checkpoints)
+
+# island model GA: the islands exchange their best genotypes
+GA_ISLANDS = 4  # number of islands (one process each)
+GA_MIGRATION_INTERVAL = 20  # exchange each n iterations
+GA_MIGRANTS = 2  # number of best genotypes sent to the next island
+GA_ISLANDS_POLL_SECONDS = 5  # check if an island has died each n seconds without results
+
 # Log progress info at ...
 GA_INFO_ITERATIONS = 100  # log info at least each n iterations if there are any score variation
 GA_LOG_PC_SCORE_IMPROV = 0.02  # also log score when it improves at least this
 
+# log lines format
+LOG_FORMAT = '[%(asctime)s] [%(levelname)s] - %(message)s'
+
 # solutions file name
 FILE_NAME_SEP = '-'
 FILE_PREFIX = 'MT'
@@ -42,16 +105,46 @@ FILE_DATESTAMP_FMT = '%Y%m%d_%H%M%S'
 FILE_NZ_LIT = 'nz'  # number of zones to obtain
 FILE_PC_LIT = 'pc'  # GA used population cardinality
 FILE_IT_LIT = 'it'  # actual iteration number
+FILE_ISLAND_LIT = 'isl'  # island number (island model GA)
 FILE_IS_SOLUTION = 'SOL'
 FILE_MAP_SUFFIX = 'MAP'
 FILE_MAP_EXT = '.png'
 FILE_TXT_SUFFIX = 'ALPHA'
 FILE_TXT_EXT = '.json'
+FILE_SWEEP_SUFFIX = 'SWEEP'
+FILE_TRACE_SUFFIX = 'TRACE'
+FILE_TRACE_EXT = '.mtt'
+FILE_CHECKPOINT_SUFFIX = 'CHECKPOINT'
+FILE_CHECKPOINT_EXT = '.npz'
+
+# prepared data cache file
+CACHE_FORMAT_VERSION = 1  # increment it when the prepared data changes its content
+CACHE_FILE_LIT = 'DATA'
+CACHE_FILE_EXT = '.pkl'
+CACHE_KEY_LEN = 16  # number of key hexadecimal digits at the file name
+CACHE_KEY_ENTRY = 'key'
+CACHE_DATA_ENTRY = 'prepared_data'
+
+# run checkpoint file
+CHECKPOINT_FORMAT_VERSION = 1  # increment it when the checkpoint changes its content
+CHECKPOINT_VERSION_ENTRY = 'format_version'
 
 # solutions plot
 PLOT_FIGSIZE = (20, 15)  # Plot figure size
 PLOT_SCORE_MG = "Last best score was: {:.8f}"
 PLOT_WINDOW_ZOOM = [0.1, 0.25, 0.5, 0.65]  # [wmin_x, wmin_y, wmax_x, wmax_y]
+PLOT_PROGRESS_MAPS = True  # False: save only the solution map (with GA_RUN_TRACE, the trace has all of them)
+
+# fast raster maps: the progress maps are label images
+# (the solution map is always the full plot)
+PLOT_RASTER_MAPS = True
+PLOT_RASTER_EVERY_IMPROVEMENT = True  # save a progress map at every best score improvement
+PLOT_RASTER_WIDTH = 1200  # whole map image width, in pixels (the zoom window has the same height)
+PLOT_RASTER_BOUND_COLOR = 'C0'  # map boundary lines
+PLOT_RASTER_ZONE_BORDER_COLOR = 'black'
+PLOT_RASTER_CENTER_RADIUS = 6  # zone center mark radius, in pixels
+PLOT_RASTER_PNG_COMPRESS_LEVEL = 1  # zlib level (0-9): faster saves, bigger files
+PLOT_TRACE_GIF_FRAME_MS = 250  # run trace animation frame duration (see mt_trace_render.py)
 
 # what are the interesting fields in loaded from file panda DataFrame
 PD_DATA_CODE_FIELD = 'CODE'
@@ -70,12 +163,22 @@ DICT_DISTRICT_NEIGHBOURS_CODE_LIST = 'NEIGHBOURS_CODE_LIST'
 DICT_DISTRICT_NEIGHBOURS_COST_LIST = 'NEIGHBOURS_COST_LIST'
 DICT_DISTRICT_CENTROID_POINT = 'CENTROID'
 
+# methods to compute the district neighbours connectivity cost
+GEO_ADJACENCY_BUFFER = 'buffer'  # common border area overlapped by a 1 meter buffered district
+GEO_ADJACENCY_EDGES = 'edges'  # exact common border length from the shared polygon edges
+GEO_ADJACENCY_METHOD = GEO_ADJACENCY_BUFFER  # default method
+GEO_EDGES_DECIMALS = 3  # decimal digits (millimeters) to match the shared polygon edges vertices
+
 #
 # messages
 #
 
 MG_DEBUG_INTERNAL_ERROR = \
     "Please debug this internal error"
+MG_INFO_CACHE_LOADED = \
+    "Prepared data loaded from cache file {}"
+MG_INFO_CACHE_SAVED = \
+    "Prepared data saved to cache file {}"
 MG_INFO_COMPUTING_VALID_AREA = \
     "Computing the feasible zone centers region map"
 MG_INFO_PARTITION_DESIGNER_INIT = \
@@ -89,13 +192,45 @@ MG_INFO_PARTITIONS_RESTORED = \
 MG_INFO_INITIAL_SCORE = \
     "The initial best score is {:.8f}"
 MG_INFO_LAST_SCORE = \
-    "After {} iterations best score is {:.8f}"
+    "After {} iterations best score is {:.8f} (fitness cache hit rate {:.2%})"
 MG_INFO_SOLUTION_FOUND = \
     "After {} iterations solution score is {:.8f}"
+MG_INFO_DISTANCE_CACHE = \
+    "Distances cache: {} hits, {} misses, {} evictions (hit rate {:.2%})"
+MG_INFO_FITNESS_CACHE = \
+    "Fitness cache: {} hits, {} misses, {} evictions (hit rate {:.2%})"
+MG_INFO_ZONE_CACHE = \
+    "Zones cache: {} hits, {} misses, {} evictions (hit rate {:.2%})"
 MG_INFO_SAVING_MAP = \
     "Saving status map at iteration {} to file {}"
 MG_INFO_SAVING_TXT = \
     "Saving status json at iteration {} to file {}"
+MG_INFO_SWEEP_START = \
+    "Starting a sweep of {} jobs using {} processes"
+MG_INFO_SWEEP_JOB = \
+    "Sweep job nz={} pc={}: best score {:.8f} after {} iterations in {:.1f} s"
+MG_INFO_SWEEP_END = \
+    "Sweep of {} jobs done in {:.1f} s"
+MG_INFO_SAVING_TRACE = \
+    "Saving run trace to file {}"
+MG_INFO_RUN_TRACE = \
+    "Run trace: {} records, {} bytes"
+MG_INFO_SAVING_CHECKPOINT = \
+    "Saving checkpoint at iteration {} to file {}"
+MG_INFO_RESUMING = \
+    "Resuming the run from checkpoint {} at iteration {} with score {:.8f}"
+MG_INFO_SAVING_SWEEP = \
+    "Saving sweep summary json to file {}"
+MG_INFO_OFFSPRING_WORKERS = \
+    "Composing and evaluating the children at {} worker processes"
+MG_INFO_MAP_RENDERER = \
+    "Map renderer: {} maps submitted, {} skipped"
+MG_INFO_ISLANDS_START = \
+    "Starting {} islands for nz={} pc={}"
+MG_INFO_ISLAND_END = \
+    "Island {}: best score {:.8f} after {} iterations, {} migrants received, in {:.1f} s"
+MG_INFO_ISLANDS_END = \
+    "Best island is {} with score {:.8f}, all islands done in {:.1f} s"
 MG_INFO_ZONE_LOWER = \
     "Zone {} with value {} is below the lower margin boundary {:0n}"
 MG_INFO_ZONE_UPPER = \
@@ -113,5 +248,31 @@ MG_ERROR_NUM_ZONES = \
     "'num_zones' must be an integer between 2 and data cardinality"
 MG_ERROR_POP_CARD = \
     "'pop_card' must be an even positive integer"
+MG_ERROR_ADJACENCY_METHOD = \
+    f"'method' must be '{GEO_ADJACENCY_BUFFER}' or '{GEO_ADJACENCY_EDGES}'"
+MG_ERROR_NUM_ISLANDS = \
+    "'num_islands' must be an integer greater than 1"
+MG_ERROR_ISLAND_FAILED = \
+    "Island {} failed: {}"
+MG_ERROR_ISLAND_EXIT_CODE = \
+    "its process exited with code {}"
+MG_ERROR_ISLANDS_FAILED = \
+    "All the islands failed"
+MG_ERROR_CENTER_ENCODING = \
+    f"'GA_CENTER_ENCODING' must be '{GA_CENTERS_CONTINUOUS}', '{GA_CENTERS_CENTROIDS}' or '{GA_CENTERS_LATTICE}'"
+MG_ERROR_NUM_CANDIDATES = \
+    "There are only {} zone center candidates, less than zones"
+MG_ERROR_CANDIDATES_TABLE = \
+    "The {} districts x {} zone center candidates distances table is bigger than GA_CENTERS_MAX_TABLE_SIZE"
+MG_ERROR_RENDER = \
+    "Error rendering a map"
+MG_ERROR_CHECKPOINT = \
+    "'{}' is not a checkpoint of this run (or its format version is not supported)"
+MG_ERROR_CHECKPOINT_STEADY_STATE = \
+    "The steady state GA can not be resumed from a checkpoint"
+MG_ERROR_TRACE_FILE = \
+    "'{}' is not a run trace file (or its format version is not supported)"
+MG_ERROR_TRACE_ITERATION = \
+    "There is not a traced partition at iteration {}"
 MG_ERROR_ENTRY_NOT_FOUND = \
     "'{}' key not found in '{}' dictionary"
@@ -0,0 +1,118 @@
+# Pràctica de creació de zones electorals per algorismes genètics
+#
+# IC - MUSI 21 22 - UIB
+#
+# Alumne: Lluís Bernat Ladaria
+
+"""
+Zone design - decoding benchmark
+================================
+
+Times the two ways of searching the nearest zone center
+of every district (see Partition.compose_partition):
+- brute force: the districts x zones distances matrix and its argmin
+- KD-tree: a tree of the zone centers queried by the districts centroids
+for several numbers of zones, to locate the crossover point
+(see GA_KDTREE_MIN_ZONES at mt_common.py)
+
+The districts centroids are uniformly distributed random points
+"""
+
+#
+# system libraries
+#
+
+import sys
+import time
+import numpy as np
+
+#
+# ours libraries and classes
+#
+
+from mt_DistrictModel import DistrictModel, kdtree_available
+import mt_common as our
+
+
+#
+# benchmark functions
+#
+
+def make_random_model(num_districts: int, rng: np.random.Generator) -> DistrictModel:
+    # return a districts model with 'num_districts'
+    # random centroids into the unit square (and no neighbours)
+
+    codes = list(range(num_districts))
+    data = [[code, 1] for code in codes]
+    geodata = {code: {our.DICT_DISTRICT_NEIGHBOURS_CODE_LIST: [],
+                      our.DICT_DISTRICT_NEIGHBOURS_COST_LIST: [],
+                      our.DICT_DISTRICT_CENTROID_POINT: rng.random(2).tolist()}
+               for code in codes}
+
+    model = DistrictModel(data=data, geodata=geodata)
+
+    return model
+
+
+def time_it(function, repeat: int) -> float:
+    # return the best time (seconds) of 'repeat' calls to 'function'
+    #
+
+    best = None
+
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+
+def run_benchmark(num_districts_list: list, num_zones_list: list, repeat: int):
+    # print the brute force and KD-tree decoding times
+    # for every number of districts and zones
+
+    rng = np.random.default_rng(0)
+
+    print(f"{'districts':>10} {'zones':>6} {'brute (ms)':>11} {'kd-tree (ms)':>13} {'speedup':>8}")
+
+    for num_districts in num_districts_list:
+        model = make_random_model(num_districts=num_districts, rng=rng)
+
+        for num_zones in num_zones_list:
+            centers = rng.random((num_zones, 2))
+
+            def brute_force():
+                return np.argmin(model.center_distances(centers=centers), axis=1)
+
+            def kd_tree():
+                return model.nearest_centers(centers=centers)[0]
+
+            # both must find the same nearest centers
+            if not np.array_equal(brute_force(), kd_tree()):
+                raise ValueError(our.MG_DEBUG_INTERNAL_ERROR)
+
+            brute_time = time_it(function=brute_force, repeat=repeat)
+            tree_time = time_it(function=kd_tree, repeat=repeat)
+
+            print(f"{num_districts:>10} {num_zones:>6} {brute_time * 1000:>11.2f} "
+                  f"{tree_time * 1000:>13.2f} {brute_time / tree_time:>8.2f}")
+
+    pass
+
+
+if __name__ == '__main__':
+    #
+    # constants
+    #
+
+    NUM_DISTRICTS = [140, 5000, 50000]
+    NUM_ZONES = [2, 8, 16, 32, 64, 128, 256, 512]
+    REPEAT = 5
+
+    if not kdtree_available():
+        sys.exit("scipy is needed to run the KD-tree decoding benchmark")
+
+    run_benchmark(num_districts_list=NUM_DISTRICTS, num_zones_list=NUM_ZONES, repeat=REPEAT)
@@ -19,9 +19,19 @@ for every tuple of parameters
 
 import os
 import sys
+import hashlib
+import pickle
+import json
+import random
+import time
+import queue
+import multiprocessing as mp
+from datetime import datetime
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 import logging as log
+import shapely
 
 #
 # ours libraries and classes
@@ -29,13 +39,40 @@ import logging as log
 
 import mt_common as our
 from mt_PartitionDesigner import PartitionDesigner
+from mt_IslandMigration import IslandMigration
+from mt_Checkpoint import load_checkpoint
 
 
 #
 # main program functions
 #
 
-def make_my_neighbours_lists(from_geos: gpd.GeoSeries, me: int, ind_vals: list) -> list:
+def find_my_neighbours(from_geos: gpd.GeoSeries, me: int, sindex=None) -> list:
+    """
+    Return the (ascending) list of positions of the 'me' neighbours,
+    that is, the geometric entities that touches the 'me' one
+
+    If a spatial index of 'from_geos' is given (see GeoSeries.sindex)
+    only the entities whose bounding box overlaps the 'me' one
+    are tested, otherwise 'me' is tested against every entity
+    """
+    if sindex is None:
+        # test me against every entity
+        is_in_touch = from_geos.touches(from_geos.iloc[me])
+        positions = [j for j in range(len(is_in_touch)) if is_in_touch.iloc[j]]
+    else:
+        # the spatial index only returns the entities
+        # that satisfies the predicate, so
+        # we only have to sort them
+        positions = sorted(int(j) for j in sindex.query(from_geos.iloc[me], predicate='touches'))
+
+    # i'm not my own neighbour
+    my_neighbours_positions = [j for j in positions if j != me]
+
+    return my_neighbours_positions
+
+
+def make_my_neighbours_lists(from_geos: gpd.GeoSeries, me: int, ind_vals: list, sindex=None) -> list:
     """
     Make the 'me' list of neighbours
 
@@ -59,6 +96,10 @@ def make_my_neighbours_lists(from_geos: gpd.GeoSeries, me: int, ind_vals: list)
         - id: '07010' ('Bunyola')
         - id: '07018' ('Deià')
         - id: '07019' ('Escorca'): the smaller common border-line segment
+
+    When a spatial index of 'from_geos' is given as 'sindex',
+    only the candidates whose bounding box overlaps the 'me' one
+    are tested and overlaid (the result is exactly the same)
     """
     assert len(from_geos) == len(ind_vals), \
         "Alert, length of geoserie index values list is not equal to geoserie cardinality"
@@ -67,39 +108,62 @@ def make_my_neighbours_lists(from_geos: gpd.GeoSeries, me: int, ind_vals: list)
     my_neighbours = list()
 
     # who are my neighbours?
-    is_in_touch = from_geos.touches(from_geos.iloc[me])
+    neighbours_positions = find_my_neighbours(from_geos=from_geos, me=me, sindex=sindex)
 
     # how many borderline we share?
     border_thickness = 1  # use 1 meter buffer to calc common 'area' border
     # compute myself 1 meter over-sized
     me_buffered = from_geos.iloc[me].buffer(distance=border_thickness)
-    # now compute overlapped area from my 1-meter bigger version vs rest geometric entities
-    common_border_area = from_geos.intersection(me_buffered).area
+    # now compute overlapped area from my 1-meter bigger version vs my neighbours
+    common_border_area = list(from_geos.iloc[neighbours_positions].intersection(me_buffered).area)
+
+    # rank them by its relative border areas
+    my_neighbours_lists = rank_my_neighbours(
+        positions=neighbours_positions, common_border=common_border_area, ind_vals=ind_vals)
+
+    return my_neighbours_lists
+
 
-    # calculate relative border areas shared with my neighbours
+def rank_my_neighbours(positions: list, common_border: list, ind_vals: list) -> list:
+    """
+    Compute the neighbours connectivity cost from the common border measure
+    (a border area or a border length) shared with each one of them
+
+    The output is a list with two lists (see make_my_neighbours_lists):
+    the neighbours codes and its connectivity cost,
+    both ordered (ascending) by the connectivity cost value
+
+    :param positions: the neighbours positions (ascending)
+    :param common_border: the common border measure with each neighbour
+    :param ind_vals: the codes of all the entities
+    :return:
+    """
+
+    # the new list
+    my_neighbours = list()
+
+    # calculate relative border measures shared with my neighbours
     #
 
-    # initialize common area accumulator
-    total_common_area = 0.
+    # initialize common border accumulator
+    total_common_border = 0.
 
     # calculate total border length
-    for j in range(len(is_in_touch)):
-        if (me != j) and is_in_touch[j]:
-            total_common_area += common_border_area[j]
+    for border in common_border:
+        total_common_border += border
 
-    # make safe if there are no common area
+    # make safe if there are no common border
     # (i.e. an isolated district)
-    if total_common_area == 0.:
-        total_common_area = 1.
+    if total_common_border == 0.:
+        total_common_border = 1.
 
     # compute ranking list
-    for j in range(len(is_in_touch)):
-        if (me != j) and is_in_touch[j]:
-            new_entry = [
-                ind_vals[j],
-                round(1.0 - common_border_area[j] / total_common_area, ndigits=6)
-            ]
-            my_neighbours.append(new_entry)
+    for j, border in zip(positions, common_border):
+        new_entry = [
+            ind_vals[j],
+            round(1.0 - border / total_common_border, ndigits=6)
+        ]
+        my_neighbours.append(new_entry)
 
     # now order list ascending using neighbourhood calculated cost value
     my_neighbours.sort(key=lambda neighbour_entry: neighbour_entry[1])
@@ -113,23 +177,119 @@ def make_my_neighbours_lists(from_geos: gpd.GeoSeries, me: int, ind_vals: list)
     return my_neighbours_lists
 
 
-def make_dist_conn_dict(from_geo: gpd.GeoDataFrame, by_field: str) -> dict:
+def make_shared_border_lengths(from_geos: gpd.GeoSeries, decimals: int) -> list:
+    """
+    Compute the exact length of the border shared by each pair of entities
+    with a single pass over all the polygon rings segments
+
+    Every ring segment is normalized (its end points sorted) and
+    its coordinates rounded to 'decimals' digits, so the segments
+    that are shared by two entities become equal rows.
+    Sorting the rows puts them together, and its length is added
+    to the border of both entities.
+    It expects a topologically clean map (the common borders
+    of two neighbours are described by the same vertices),
+    so two entities that only touch at a point are not neighbours
+
+    The output is a list with a dictionary for each entity,
+    {neighbour position: common border length}
+
+    :param from_geos: the polygonal entities
+    :param decimals: number of decimal digits to compare coordinates
+    :return:
+    """
+
+    segments = list()
+    owners = list()
+
+    # collect every ring segment
+    for i, geom in enumerate(from_geos):
+        polygons = geom.geoms if hasattr(geom, 'geoms') else [geom]
+        for polygon in polygons:
+            for ring in [polygon.exterior, *polygon.interiors]:
+                coords = np.round(np.asarray(ring.coords)[:, :2], decimals=decimals)
+                segments.append(np.hstack([coords[:-1], coords[1:]]))
+                owners.append(np.full(len(coords) - 1, i))
+
+    shared_borders = [dict() for _ in range(len(from_geos))]
+
+    if len(segments) == 0:
+        return shared_borders
+
+    segments = np.vstack(segments)
+    owners = np.concatenate(owners)
+
+    # normalize segments orientation: (x0, y0) must be the lower end point
+    swap = (segments[:, 0] > segments[:, 2]) | \
+           ((segments[:, 0] == segments[:, 2]) & (segments[:, 1] > segments[:, 3]))
+    segments[swap] = segments[swap][:, [2, 3, 0, 1]]
+
+    # put the equal segments together
+    order = np.lexsort((segments[:, 3], segments[:, 2], segments[:, 1], segments[:, 0]))
+    segments = segments[order]
+    owners = owners[order]
+
+    # a shared segment is equal to the following one
+    # and is owned by a different entity
+    is_shared = np.all(segments[:-1] == segments[1:], axis=1) & (owners[:-1] != owners[1:])
+    at = np.flatnonzero(is_shared)
+    lengths = np.hypot(segments[at, 2] - segments[at, 0], segments[at, 3] - segments[at, 1])
+
+    # accumulate the lengths by pair of entities (in both directions)
+    n_geos = len(from_geos)
+    pair_keys = np.concatenate([owners[at] * n_geos + owners[at + 1],
+                                owners[at + 1] * n_geos + owners[at]])
+    pair_lengths = np.concatenate([lengths, lengths])
+    unique_keys, key_at = np.unique(pair_keys, return_inverse=True)
+    unique_lengths = np.bincount(key_at.ravel(), weights=pair_lengths)
+
+    for key, length in zip(unique_keys, unique_lengths):
+        shared_borders[int(key) // n_geos][int(key) % n_geos] = float(length)
+
+    return shared_borders
+
+
+def make_dist_conn_dict(from_geo: gpd.GeoDataFrame, by_field: str,
+                        method: str = our.GEO_ADJACENCY_METHOD) -> dict:
     """
     Calculates a dictionary of lists with the neighbours districts
     and the centroid points
 
+    The neighbours connectivity cost can be computed using two methods:
+    - GEO_ADJACENCY_BUFFER: the common border is measured as the area
+      overlapped by each district 1 meter over-sized version.
+      A spatial index (STR-tree) is built once, so each district is only
+      tested against the districts whose bounding box overlaps its own,
+      instead of against the whole map
+    - GEO_ADJACENCY_EDGES: the common border is the exact length of the
+      shared ring segments, computed with a single pass over
+      all the polygon edges (see make_shared_border_lengths)
+
     :param from_geo:
     :param by_field:
+    :param method: GEO_ADJACENCY_BUFFER or GEO_ADJACENCY_EDGES
     :return:
     """
+    if method not in [our.GEO_ADJACENCY_BUFFER, our.GEO_ADJACENCY_EDGES]:
+        raise ValueError(our.MG_ERROR_ADJACENCY_METHOD)
+
     # our new dict of lists
     geodata_dict = dict()
 
     # a GeoSeries object is needed to
     # calculate centroids and intersection areas
-    geos = gpd.GeoSeries(from_geo.geometry)
+    geos = gpd.GeoSeries(from_geo.geometry).reset_index(drop=True)
     index_values = list(from_geo[by_field])
 
+    if method == our.GEO_ADJACENCY_EDGES:
+        # all the common border lengths at once
+        shared_borders = make_shared_border_lengths(from_geos=geos, decimals=our.GEO_EDGES_DECIMALS)
+        sindex = None
+    else:
+        # the spatial index to query the neighbour candidates
+        shared_borders = None
+        sindex = geos.sindex
+
     for i in range(len(from_geo)):
         # get district code
         new_district_code = from_geo[by_field].iloc[i]
@@ -137,8 +297,15 @@ def make_dist_conn_dict(from_geo: gpd.GeoDataFrame, by_field: str) -> dict:
         centroid = geos[i].centroid
         centroid_point = (centroid.x, centroid.y)
         # get district neighbours list and associated connectivity cost list
-        [code_list, cost_list] = make_my_neighbours_lists(
-            from_geos=geos, me=i, ind_vals=index_values)
+        if shared_borders is not None:
+            neighbours_positions = sorted(shared_borders[i])
+            [code_list, cost_list] = rank_my_neighbours(
+                positions=neighbours_positions,
+                common_border=[shared_borders[i][j] for j in neighbours_positions],
+                ind_vals=index_values)
+        else:
+            [code_list, cost_list] = make_my_neighbours_lists(
+                from_geos=geos, me=i, ind_vals=index_values, sindex=sindex)
         # create a little dictionary containing:
         # - neighbours code list
         # - connectivity cost neighbours list
@@ -157,7 +324,7 @@ def make_dist_conn_dict(from_geo: gpd.GeoDataFrame, by_field: str) -> dict:
 def prepare_data(bound_path: str,
                  dis_path: str, dis_index_field: str,
                  dat_path: str, dat_index_field: str, dat_value_field: str,
-                 logger: log.Logger) -> object:
+                 logger: log.Logger, adjacency_method: str = our.GEO_ADJACENCY_METHOD) -> object:
     """
     Load maps, and alpha data.
     Also constructs the district connection matrix (actually a nested dict)
@@ -171,6 +338,7 @@ def prepare_data(bound_path: str,
     :param dat_index_field:
     :param dat_value_field:
     :param logger:
+    :param adjacency_method: how to compute the neighbours connectivity cost (see make_dist_conn_dict)
     :return:
     """
 
@@ -211,7 +379,7 @@ def prepare_data(bound_path: str,
     valid_area = gpd_dis.geometry.unary_union
 
     logger.info("Making district connectivity matrix from districts map. Really its a dictionary of lists...")
-    conn_dict = make_dist_conn_dict(from_geo=gpd_dis, by_field=dis_index_field)
+    conn_dict = make_dist_conn_dict(from_geo=gpd_dis, by_field=dis_index_field, method=adjacency_method)
     logger.debug("District connectivity matrix:")
     logger.debug(conn_dict)
     logger.info("...done district connectivity matrix")
@@ -219,6 +387,477 @@ def prepare_data(bound_path: str,
     return gpd_bound, gpd_dis, valid_area, dat_list, conn_dict
 
 
+def compute_prepared_data_key(file_paths: list, params: list) -> str:
+    """
+    Compute the key (an hexadecimal hash) that identifies the prepared data
+    obtained from the 'file_paths' files contents
+    and the 'params' parameters values
+
+    Any change on the input files, the parameters,
+    the cache format or the geospatial libraries versions
+    produces a new key
+
+    :param file_paths: list of input files paths
+    :param params: list of parameters values (anything that can be converted to str)
+    :return:
+    """
+
+    digest = hashlib.sha256()
+
+    # what produces the prepared data
+    digest.update(str(our.CACHE_FORMAT_VERSION).encode('utf-8'))
+    digest.update(str([gpd.__version__, shapely.__version__, np.__version__]).encode('utf-8'))
+    digest.update(str(params).encode('utf-8'))
+
+    # the input files contents
+    for file_path in file_paths:
+        with open(file_path, 'rb') as infile:
+            for chunk in iter(lambda: infile.read(1 << 20), b''):
+                digest.update(chunk)
+
+    key = digest.hexdigest()
+
+    return key
+
+
+def get_prepared_data_path(cache_dir: str, key: str) -> str:
+    # return the cache file path of the 'key' prepared data
+    #
+
+    cache_file_name = our.FILE_NAME_SEP.join([our.FILE_PREFIX, our.CACHE_FILE_LIT, key[:our.CACHE_KEY_LEN]])
+
+    cache_path = os.path.normpath(cache_dir + '/' + cache_file_name + our.CACHE_FILE_EXT)
+
+    return cache_path
+
+
+def load_prepared_data(cache_path: str, key: str):
+    """
+    Load the prepared data from the 'cache_path' file
+    Return None if there are no such file or it does not contain
+    the 'key' prepared data (so it must be prepared again)
+
+    :param cache_path:
+    :param key:
+    :return:
+    """
+
+    if not os.path.isfile(cache_path):
+        return None
+
+    try:
+        with open(cache_path, 'rb') as infile:
+            cached = pickle.load(infile)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        # a damaged or outdated file, just ignore it
+        return None
+
+    if type(cached) is not dict or cached.get(our.CACHE_KEY_ENTRY) != key:
+        return None
+
+    prepared = cached.get(our.CACHE_DATA_ENTRY)
+
+    return prepared
+
+
+def save_prepared_data(cache_path: str, key: str, prepared: tuple):
+    """
+    Save the prepared data to the 'cache_path' file
+    The file is written to a temporary file and then renamed,
+    so a concurrent reader never gets an incomplete file
+
+    :param cache_path:
+    :param key:
+    :param prepared:
+    :return:
+    """
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+    cached = {
+        our.CACHE_KEY_ENTRY: key,
+        our.CACHE_DATA_ENTRY: prepared
+    }
+
+    tmp_path = cache_path + '.' + str(os.getpid()) + '.tmp'
+    with open(tmp_path, 'wb') as outfile:
+        pickle.dump(cached, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+
+    pass
+
+
+def prepare_data_cached(cache_dir: str,
+                        bound_path: str,
+                        dis_path: str, dis_index_field: str,
+                        dat_path: str, dat_index_field: str, dat_value_field: str,
+                        logger: log.Logger, adjacency_method: str = our.GEO_ADJACENCY_METHOD) -> object:
+    """
+    Same as prepare_data(), but the prepared data
+    (projected maps, valid area, data list and connectivity dictionary)
+    is saved to a binary file at 'cache_dir' folder,
+    so next runs with the same input files and parameters
+    only have to load it
+
+    :param cache_dir: path to folder where the prepared data will be saved
+    (see prepare_data for the rest of params)
+    :return:
+    """
+
+    key = compute_prepared_data_key(
+        file_paths=[bound_path, dis_path, dat_path],
+        params=[dis_index_field, dat_index_field, dat_value_field,
+                adjacency_method, our.GEO_EDGES_DECIMALS])
+    cache_path = get_prepared_data_path(cache_dir=cache_dir, key=key)
+
+    prepared = load_prepared_data(cache_path=cache_path, key=key)
+
+    if prepared is not None:
+        logger.info(our.MG_INFO_CACHE_LOADED.format(cache_path))
+    else:
+        prepared = prepare_data(bound_path=bound_path, dis_path=dis_path, dis_index_field=dis_index_field,
+                                dat_path=dat_path, dat_index_field=dat_index_field,
+                                dat_value_field=dat_value_field,
+                                logger=logger, adjacency_method=adjacency_method)
+        save_prepared_data(cache_path=cache_path, key=key, prepared=prepared)
+        logger.info(our.MG_INFO_CACHE_SAVED.format(cache_path))
+
+    return prepared
+
+
+#
+# parameters sweep functions
+#
+
+# the prepared data shared by the sweep worker processes
+# (inherited copy-on-write when the processes are forked)
+_sweep_prepared = None
+
+
+def _init_sweep_worker(prepared: tuple, logger_name: str, log_level: int):
+    # initialize a sweep worker process
+    # saving the prepared data, and
+    # making sure it has a logger to write to
+
+    global _sweep_prepared
+    _sweep_prepared = prepared
+
+    logger = log.getLogger(logger_name)
+    logger.setLevel(log_level)
+    if len(logger.handlers) == 0:
+        # not forked (spawned) process
+        handler = log.StreamHandler(sys.stderr)
+        handler.setFormatter(log.Formatter(our.LOG_FORMAT))
+        logger.addHandler(handler)
+
+    pass
+
+
+def _run_sweep_job(job: dict) -> dict:
+    # compute a solution for a (num_zones, pop_card) tuple
+    # and return its summary
+    #
+
+    gpd_bound, gpd_dis, valid_area, dat_list, geodata_dict = _sweep_prepared
+
+    # the forked processes inherit the same random generator state
+    random.seed(job['seed'])
+
+    t_start = time.perf_counter()
+
+    solution = PartitionDesigner(
+        data=dat_list, geodata=geodata_dict,
+        valid_area=valid_area,
+        num_zones=job['num_zones'], pop_card=job['pop_card'],
+        logger=log.getLogger(job['logger_name']),
+        gpd_bound=gpd_bound, gpd_dis=gpd_dis,
+        save_maps_to=job['save_maps_to'])
+
+    # compute best partition and
+    # plot each relevant hit
+    solution.fit()
+
+    summary = {
+        'num_zones': job['num_zones'],
+        'pop_card': job['pop_card'],
+        'best_score': solution.last_best_score,
+        'iterations': len(solution.best_score_history) - 1,
+        'seconds': round(time.perf_counter() - t_start, 3),
+        'pid': os.getpid()
+    }
+
+    return summary
+
+
+def run_sweep(prepared: tuple, num_zones_list: list, pop_card_list: list,
+              logger: log.Logger, save_maps_to: str, max_workers: int = 1) -> list:
+    """
+    Compute a solution for every tuple {num_zones_list x pop_card_list}
+    spreading them across a pool of worker processes
+
+    The prepared data (see prepare_data) is handed once to each worker:
+    forked workers share it copy-on-write.
+    The jobs are scheduled the longest first (the more zones
+    and the bigger population, the longer run),
+    so the pool is not waiting for a big job at the end.
+    A summary (score, iterations and run time of each job)
+    is logged and saved as a json file at 'save_maps_to' folder
+
+    :param prepared: the tuple returned by prepare_data
+    :param num_zones_list: list of number of zones to compute
+    :param pop_card_list: list of population cardinalities to test
+    :param logger:
+    :param save_maps_to: path to folder where the maps and the summary will be saved
+    :param max_workers: number of worker processes (None: as many as CPUs, 1: no worker processes)
+    :return: list with the summary of each job, in scheduling order
+    """
+
+    # the longest jobs first
+    jobs = [{'num_zones': nz, 'pop_card': pc,
+             'seed': random.getrandbits(64),
+             'logger_name': logger.name,
+             'save_maps_to': save_maps_to}
+            for nz in num_zones_list for pc in pop_card_list]
+    jobs.sort(key=lambda job: (job['num_zones'] * job['pop_card'], job['num_zones']), reverse=True)
+
+    n_workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+
+    logger.info(our.MG_INFO_SWEEP_START.format(len(jobs), n_workers))
+
+    t_start = time.perf_counter()
+
+    initargs = (prepared, logger.name, logger.level)
+
+    if n_workers <= 1:
+        # all the jobs at this process
+        _init_sweep_worker(*initargs)
+        summaries = [_run_sweep_job(job) for job in jobs]
+    else:
+        # prefer forking the workers, to share the prepared data copy-on-write
+        if 'fork' in mp.get_all_start_methods():
+            context = mp.get_context('fork')
+        else:
+            context = mp.get_context()
+        with context.Pool(processes=n_workers, initializer=_init_sweep_worker, initargs=initargs) as pool:
+            summaries = pool.map(_run_sweep_job, jobs, chunksize=1)
+
+    elapsed = time.perf_counter() - t_start
+
+    for summary in summaries:
+        logger.info(our.MG_INFO_SWEEP_JOB.format(
+            summary['num_zones'], summary['pop_card'], summary['best_score'],
+            summary['iterations'], summary['seconds']))
+    logger.info(our.MG_INFO_SWEEP_END.format(len(jobs), elapsed))
+
+    # save the summary
+    summary_file_name = our.FILE_NAME_SEP.join(
+        [our.FILE_PREFIX, datetime.now().strftime(our.FILE_DATESTAMP_FMT).replace('_', our.FILE_NAME_SEP),
+         our.FILE_SWEEP_SUFFIX]) + our.FILE_TXT_EXT
+    full_output_fname = os.path.normpath(save_maps_to + '/' + summary_file_name)
+    logger.info(our.MG_INFO_SAVING_SWEEP.format(full_output_fname))
+    with open(full_output_fname, 'w') as outfile:
+        json.dump({'seconds': round(elapsed, 3), 'jobs': summaries}, outfile, indent=1)
+
+    return summaries
+
+
+def resume_run(prepared: tuple, checkpoint_path: str, logger: log.Logger, save_maps_to: str) -> PartitionDesigner:
+    """
+    Continue a run from its checkpoint file (see PartitionDesigner.fit)
+    The run continues exactly as it would without the interruption,
+    up to GA_MAX_ITERATIONS (it can be raised to extend a finished run)
+
+    :param prepared: the prepared data (see prepare_data)
+    :param checkpoint_path: the checkpoint file
+    :param logger:
+    :param save_maps_to: where the run saves its maps and files
+    :return: the PartitionDesigner, with the found solution
+    """
+
+    gpd_bound, gpd_dis, valid_area, dat_list, geodata_dict = prepared
+
+    # the designer parameters are saved at the checkpoint
+    checkpoint = load_checkpoint(file_name=checkpoint_path)
+    island = int(checkpoint['island'])
+
+    solution = PartitionDesigner(
+        data=dat_list, geodata=geodata_dict,
+        valid_area=valid_area,
+        num_zones=int(checkpoint['num_zones']), pop_card=int(checkpoint['pop_card']),
+        logger=logger,
+        gpd_bound=gpd_bound, gpd_dis=gpd_dis,
+        save_maps_to=save_maps_to,
+        island=island if island >= 0 else None)
+
+    solution.fit(resume_from=checkpoint_path)
+
+    return solution
+
+
+def _run_island(prepared: tuple, job: dict, inbox, outbox, results):
+    # compute a solution at an island of an island model GA
+    # and put its summary at 'results' queue
+    # (or the error, if the island fails, so it is never waited for)
+
+    try:
+        summary = _compute_island(prepared=prepared, job=job, inbox=inbox, outbox=outbox)
+    except Exception as error:
+        log.getLogger(job['logger_name']).exception(our.MG_ERROR_ISLAND_FAILED.format(job['island'], error))
+        summary = {'island': job['island'], 'error': repr(error)}
+
+    results.put(summary)
+
+    pass
+
+
+def _compute_island(prepared: tuple, job: dict, inbox, outbox) -> dict:
+    # compute a solution at an island of an island model GA
+    # and return its summary
+    #
+
+    gpd_bound, gpd_dis, valid_area, dat_list, geodata_dict = prepared
+
+    # each island with its own random sequence
+    random.seed(job['seed'])
+
+    t_start = time.perf_counter()
+
+    solution = PartitionDesigner(
+        data=dat_list, geodata=geodata_dict,
+        valid_area=valid_area,
+        num_zones=job['num_zones'], pop_card=job['pop_card'],
+        logger=log.getLogger(job['logger_name']),
+        gpd_bound=gpd_bound, gpd_dis=gpd_dis,
+        save_maps_to=job['save_maps_to'],
+        island=job['island'])
+
+    migration = IslandMigration(inbox=inbox, outbox=outbox)
+
+    # compute best partition exchanging genotypes with the other islands
+    solution.fit(migration=migration)
+
+    summary = {
+        'island': job['island'],
+        'best_score': solution.last_best_score,
+        'best_genotype': solution.best_partition.get_centers_array().tolist(),
+        'iterations': len(solution.best_score_history) - 1,
+        'migrants_sent': migration.sent,
+        'migrants_received': migration.received,
+        'seconds': round(time.perf_counter() - t_start, 3),
+        'pid': os.getpid()
+    }
+
+    return summary
+
+
+def _collect_island_summaries(islands: list, results, logger: log.Logger) -> list:
+    # take the summary of each island from the 'results' queue
+    # and return the summaries of the islands that have not failed
+    #
+    # an island that dies without putting its summary
+    # (killed, out of memory) is found polling its process,
+    # so a failed island is never waited for
+
+    summaries = list()
+    pending = set(range(len(islands)))
+
+    def take(summary: dict):
+        # (a failed island has already logged its error)
+        pending.discard(summary['island'])
+        if 'error' not in summary:
+            summaries.append(summary)
+
+    while len(pending) > 0:
+        try:
+            take(results.get(timeout=our.GA_ISLANDS_POLL_SECONDS))
+        except queue.Empty:
+            # a dead island summary, if any, is already at the queue
+            dead = [i for i in pending if not islands[i].is_alive()]
+            while True:
+                try:
+                    take(results.get_nowait())
+                except queue.Empty:
+                    break
+            for i in dead:
+                if i in pending:
+                    pending.discard(i)
+                    logger.error(our.MG_ERROR_ISLAND_FAILED.format(
+                        i, our.MG_ERROR_ISLAND_EXIT_CODE.format(islands[i].exitcode)))
+
+    return summaries
+
+
+def run_islands(prepared: tuple, num_zones: int, pop_card: int,
+                logger: log.Logger, save_maps_to: str, num_islands: int = our.GA_ISLANDS) -> list:
+    """
+    Compute a solution for a (num_zones, pop_card) tuple
+    with an island model GA: 'num_islands' PartitionDesigner populations
+    (each one with its own random seed) evolve at its own process,
+    exchanging its best genotypes along a ring
+    (see mt_IslandMigration.py)
+
+    Every island saves its own maps (with its island number at the file name).
+    The summary of each island is logged, and the best island is told
+
+    :param prepared: the tuple returned by prepare_data
+    :param num_zones: number of zones to compute
+    :param pop_card: population cardinality of each island
+    :param logger:
+    :param save_maps_to: path to folder where the maps will be saved
+    :param num_islands: number of islands (processes)
+    :return: list with the summary of each island, the best first
+        (the failed islands are logged, and left out)
+    """
+
+    if type(num_islands) is not int or num_islands < 2:
+        raise ValueError(our.MG_ERROR_NUM_ISLANDS)
+
+    logger.info(our.MG_INFO_ISLANDS_START.format(num_islands, num_zones, pop_card))
+
+    t_start = time.perf_counter()
+
+    # prefer forking the islands, to share the prepared data copy-on-write
+    if 'fork' in mp.get_all_start_methods():
+        context = mp.get_context('fork')
+    else:
+        context = mp.get_context()
+
+    # the ring: island i sends to island i + 1 inbox
+    inboxes = [context.Queue() for i in range(num_islands)]
+    results = context.Queue()
+
+    islands = list()
+    for i in range(num_islands):
+        job = {'island': i, 'num_zones': num_zones, 'pop_card': pop_card,
+               'seed': random.getrandbits(64),
+               'logger_name': logger.name,
+               'save_maps_to': save_maps_to}
+        island = context.Process(target=_run_island,
+                                 args=(prepared, job, inboxes[i], inboxes[(i + 1) % num_islands], results))
+        island.start()
+        islands.append(island)
+
+    summaries = _collect_island_summaries(islands=islands, results=results, logger=logger)
+
+    for island in islands:
+        island.join()
+
+    elapsed = time.perf_counter() - t_start
+
+    if len(summaries) == 0:
+        raise RuntimeError(our.MG_ERROR_ISLANDS_FAILED)
+
+    summaries.sort(key=lambda summary: summary['best_score'])
+
+    for summary in summaries:
+        logger.info(our.MG_INFO_ISLAND_END.format(
+            summary['island'], summary['best_score'], summary['iterations'],
+            summary['migrants_received'], summary['seconds']))
+    logger.info(our.MG_INFO_ISLANDS_END.format(summaries[0]['island'], summaries[0]['best_score'], elapsed))
+
+    return summaries
+
+
 #
 # main program
 #
@@ -239,9 +878,30 @@ if __name__ == '__main__':
 
     OUTPUT_REL_PATH = '../outputs'
 
+    # where to save the prepared data (set to None to always prepare it)
+    CACHE_REL_PATH = '../cache'
+
+    # how to compute the district neighbours connectivity cost
+    ADJACENCY_METHOD = our.GEO_ADJACENCY_BUFFER
+    # ADJACENCY_METHOD = our.GEO_ADJACENCY_EDGES
+
     NUM_ZONES = [2, 3, 8, 10, 20]
     POPULATION_CARDINALITIES = [10, 20]
 
+    # number of parallel processes (1: sequentially, None: as many as CPUs)
+    SWEEP_MAX_WORKERS = 1
+
+    # compute each tuple with an island model GA of this number of islands
+    # (None: a single population for each tuple)
+    NUM_ISLANDS = None
+    # NUM_ISLANDS = our.GA_ISLANDS
+
+    # continue an interrupted run from its checkpoint file, at the outputs path
+    # (saved if our.GA_CHECKPOINT_INTERVAL is set)
+    # (None: compute all the tuples)
+    RESUME_CHECKPOINT = None
+    # RESUME_CHECKPOINT = 'MT-20220101-120000-nz-8-pc-20-CHECKPOINT.npz'
+
     LOG_LEVEL = log.INFO
     # LOG_LEVEL = log.DEBUG
 
@@ -251,7 +911,7 @@ if __name__ == '__main__':
 
     logger = log.getLogger('mt_logger')
     logger.setLevel(LOG_LEVEL)
-    log_format = log.Formatter('[%(asctime)s] [%(levelname)s] - %(message)s')
+    log_format = log.Formatter(our.LOG_FORMAT)
     # writing to stderr
     handler = log.StreamHandler(sys.stderr)
     handler.setFormatter(log_format)
@@ -270,35 +930,50 @@ if __name__ == '__main__':
     districts_abs_path = os.path.normpath(current_program_path + '/' + DISTRICTS_REL_PATH)
     data_abs_path = os.path.normpath(current_program_path + '/' + DATA_REL_PATH)
     outputs_abs_path = os.path.normpath(current_program_path + '/' + OUTPUT_REL_PATH)
+    cache_abs_path = os.path.normpath(current_program_path + '/' + CACHE_REL_PATH) \
+        if CACHE_REL_PATH is not None else None
 
     # say hello
     logger.info("*** Starting process ***")
 
     # load and prepare all the data, also compute districts connectivity dictionary
     # and valid zone centroid area
-    gpd_bound, gpd_dis, valid_area, dat_list, geodata_dict = \
-        prepare_data(bound_path=boundary_abs_path, dis_path=districts_abs_path, dis_index_field=DISTRICTS_INDEX_FIELD,
-                     dat_path=data_abs_path, dat_index_field=DATA_INDEX_FIELD, dat_value_field=DATA_VALUE_FIELD,
-                     logger=logger)
-
-    # compute zones for all the tuples {NUM_ZONES x POPULATION_CARDINALITIES}
-    for nz in NUM_ZONES:
-        for pc in POPULATION_CARDINALITIES:
-
-            solution = PartitionDesigner(
-                data=dat_list, geodata=geodata_dict,
-                valid_area=valid_area,
-                num_zones=nz, pop_card=pc,
-                logger=logger,
-                gpd_bound=gpd_bound, gpd_dis=gpd_dis,
-                save_maps_to=outputs_abs_path)
-
-            # compute best partition and
-            # plot each relevant hit
-            solution.fit()
-
-            # free memory
-            del solution
+    if cache_abs_path is not None:
+        gpd_bound, gpd_dis, valid_area, dat_list, geodata_dict = \
+            prepare_data_cached(cache_dir=cache_abs_path,
+                                bound_path=boundary_abs_path, dis_path=districts_abs_path,
+                                dis_index_field=DISTRICTS_INDEX_FIELD,
+                                dat_path=data_abs_path, dat_index_field=DATA_INDEX_FIELD,
+                                dat_value_field=DATA_VALUE_FIELD,
+                                logger=logger, adjacency_method=ADJACENCY_METHOD)
+    else:
+        gpd_bound, gpd_dis, valid_area, dat_list, geodata_dict = \
+            prepare_data(bound_path=boundary_abs_path, dis_path=districts_abs_path,
+                         dis_index_field=DISTRICTS_INDEX_FIELD,
+                         dat_path=data_abs_path, dat_index_field=DATA_INDEX_FIELD, dat_value_field=DATA_VALUE_FIELD,
+                         logger=logger, adjacency_method=ADJACENCY_METHOD)
+
+    if RESUME_CHECKPOINT is not None:
+        # continue the run of a tuple
+        resume_run(prepared=(gpd_bound, gpd_dis, valid_area, dat_list, geodata_dict),
+                   checkpoint_path=os.path.normpath(outputs_abs_path + '/' + RESUME_CHECKPOINT),
+                   logger=logger, save_maps_to=outputs_abs_path)
+    elif NUM_ISLANDS is None:
+        # compute zones for all the tuples {NUM_ZONES x POPULATION_CARDINALITIES}
+        # (spreading them across SWEEP_MAX_WORKERS processes, if more than one)
+        run_sweep(prepared=(gpd_bound, gpd_dis, valid_area, dat_list, geodata_dict),
+                  num_zones_list=NUM_ZONES, pop_card_list=population_card_list,
+                  logger=logger, save_maps_to=outputs_abs_path,
+                  max_workers=SWEEP_MAX_WORKERS)
+    else:
+        # compute zones for all the tuples {NUM_ZONES x POPULATION_CARDINALITIES}
+        # each one with NUM_ISLANDS processes
+        for num_zones in NUM_ZONES:
+            for pop_card in population_card_list:
+                run_islands(prepared=(gpd_bound, gpd_dis, valid_area, dat_list, geodata_dict),
+                            num_zones=num_zones, pop_card=pop_card,
+                            logger=logger, save_maps_to=outputs_abs_path,
+                            num_islands=NUM_ISLANDS)
 
     # say goodbye
     logger.info("*** End of process ***")
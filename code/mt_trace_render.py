@@ -0,0 +1,135 @@
+# Pràctica de creació de zones electorals per algorismes genètics
+#
+# IC - MUSI 21 22 - UIB
+#
+# Alumne: Lluís Bernat Ladaria
+
+"""
+Zone design - run trace maps renderer
+=====================================
+
+Renders the maps of a run trace (see RunTrace), after the run:
+the best partition at any iteration, every traced partition,
+or an animated GIF of all of them
+
+usage: python mt_trace_render.py TRACE_FILE [-i ITERATION ...] [--all] [--gif GIF_FILE]
+
+The maps are raster maps (see RasterRenderer), saved beside the trace file
+"""
+
+#
+# system libraries
+#
+
+import os
+import sys
+import argparse
+import geopandas as gpd
+
+#
+# ours libraries and classes
+#
+
+from mt_RunTraceReader import RunTraceReader
+from mt_RasterRenderer import make_map_renderers, render_map, get_colors, save_png, to_pil_image
+import mt_common as our
+
+
+#
+# render functions
+#
+
+def load_geometries(bound_path: str, dis_path: str) -> (gpd.GeoDataFrame, gpd.GeoDataFrame):
+    # load the boundary and districts maps
+    # projected as at mt_main.prepare_data
+
+    gpd_dis = gpd.read_file(filename=dis_path, encoding='utf-8').to_crs(crs="EPSG:3857")
+    gpd_bound = gpd.read_file(filename=bound_path, encoding='utf-8').to_crs(crs="EPSG:3857")
+
+    return gpd_bound, gpd_dis
+
+
+def compute_map_file_name(trace_file_name: str, iteration: int) -> str:
+    # return the map file name of an 'iteration' of a trace
+    # as the maps saved during the run (see PartitionDesigner.save_best_map)
+
+    stem = os.path.splitext(trace_file_name)[0]
+    trace_suffix = our.FILE_NAME_SEP + our.FILE_TRACE_SUFFIX
+    if stem.endswith(trace_suffix):
+        stem = stem[:-len(trace_suffix)]
+
+    iteration_digits = len(str(our.GA_MAX_ITERATIONS))
+
+    return our.FILE_NAME_SEP.join([stem, our.FILE_IT_LIT, str(iteration).zfill(iteration_digits),
+                                   our.FILE_MAP_SUFFIX]) + our.FILE_MAP_EXT
+
+
+def render_trace(trace: RunTraceReader, gpd_bound: gpd.GeoDataFrame, gpd_dis: gpd.GeoDataFrame,
+                 iterations: list, render_all: bool, gif_file_name: str):
+    # save the maps of the 'iterations' (or of all the records, if 'render_all')
+    # and the animated GIF of all the records, if 'gif_file_name'
+
+    renderers = make_map_renderers(gpd_dis=gpd_dis, gpd_bound=gpd_bound, codes=trace.codes)
+    image_colors = get_colors(palette=trace.palette)
+
+    def render_record(k: int):
+        return render_map(renderers=renderers, assignment=trace.get_assignment(k),
+                          centers=trace.get_centers(k), num_zones=trace.num_zones)
+
+    if render_all:
+        iterations = [int(iteration) for iteration in trace.iterations]
+        records = list(range(trace.num_records))
+    else:
+        records = [trace.find_record(iteration=iteration) for iteration in iterations]
+
+    for k, iteration in zip(records, iterations):
+        map_file_name = compute_map_file_name(trace_file_name=trace.file_name, iteration=iteration)
+        print(our.MG_INFO_SAVING_MAP.format(iteration, map_file_name))
+        save_png(file_name=map_file_name, image=render_record(k), image_colors=image_colors)
+
+    if gif_file_name is not None:
+        frames = [to_pil_image(image=render_record(k), image_colors=image_colors)
+                  for k in range(trace.num_records)]
+        print(our.MG_INFO_SAVING_MAP.format(int(trace.iterations[-1]), gif_file_name))
+        frames[0].save(gif_file_name, save_all=True, append_images=frames[1:],
+                       duration=our.PLOT_TRACE_GIF_FRAME_MS, loop=0)
+
+    pass
+
+
+if __name__ == '__main__':
+    #
+    # constants
+    #
+
+    BOUNDARY_REL_PATH = '../maps/products/coast_line_geometry.geojsonl.json'
+    DISTRICTS_REL_PATH = '../maps/products/districts_geometry.geojsonl.json'
+
+    #
+    # setting parameters
+    #
+
+    parser = argparse.ArgumentParser(description="Render the maps of a run trace")
+    parser.add_argument('trace', help="the run trace file")
+    parser.add_argument('-i', '--iterations', type=int, nargs='*', default=list(),
+                        help="render the best partition at these iterations")
+    parser.add_argument('--all', action='store_true', help="render every traced partition")
+    parser.add_argument('--gif', default=None, help="save an animated GIF of every traced partition")
+    args = parser.parse_args()
+
+    current_program_path = os.path.dirname(os.path.realpath(__file__))
+    boundary_abs_path = os.path.normpath(current_program_path + '/' + BOUNDARY_REL_PATH)
+    districts_abs_path = os.path.normpath(current_program_path + '/' + DISTRICTS_REL_PATH)
+
+    run_trace = RunTraceReader(file_name=args.trace)
+    if run_trace.num_records == 0:
+        sys.exit(our.MG_ERROR_TRACE_ITERATION.format(0))
+
+    # by default, the last traced partition
+    if len(args.iterations) == 0 and not args.all and args.gif is None:
+        args.iterations = [int(run_trace.iterations[-1])]
+
+    boundary, districts = load_geometries(bound_path=boundary_abs_path, dis_path=districts_abs_path)
+
+    render_trace(trace=run_trace, gpd_bound=boundary, gpd_dis=districts,
+                 iterations=args.iterations, render_all=args.all, gif_file_name=args.gif)